@@ -84,59 +84,54 @@ TOURNAMENTS = {
     }
 }
 
-def sim_32_team_tournament(groups_dict):
-    """Generic 32-team World Cup Simulator (Used from 1998 to 2022)"""
-    group_winners = {}
-    group_runners = {}
-    
-    for grp, teams in groups_dict.items():
-        table = {t: {'p':0, 'gd':0, 'gf':0} for t in teams}
-        teams_shuffled = teams.copy()
-        np.random.shuffle(teams_shuffled)
-        
-        for i in range(len(teams_shuffled)):
-            for j in range(i+1, len(teams_shuffled)):
-                t1, t2 = teams_shuffled[i], teams_shuffled[j]
-                
-                result = sim.sim_match(t1, t2, knockout=False)
-                if result[0] == 'draw':
-                    w, g1, g2 = None, result[1], result[2]
-                else:
-                    w, g1, g2 = result[0], result[1], result[2]
-                
-                table[t1]['gf'] += g1
-                table[t2]['gf'] += g2
-                table[t1]['gd'] += (g1 - g2)
-                table[t2]['gd'] += (g2 - g1)
-                
-                if g1 > g2: table[t1]['p'] += 3
-                elif g2 > g1: table[t2]['p'] += 3
-                else: 
-                    table[t1]['p'] += 1
-                    table[t2]['p'] += 1
+# Standard 32-team Knockout Bracket mapping: (winner of group, runner-up of group)
+RO16_BRACKET = [('A', 'B'), ('C', 'D'), ('E', 'F'), ('G', 'H'), ('B', 'A'), ('D', 'C'), ('F', 'E'), ('H', 'G')]
+GROUP_PAIRS = [(i, j) for i in range(4) for j in range(i + 1, 4)]
 
-        sorted_teams = sorted(teams_shuffled, key=lambda t: (table[t]['p'], table[t]['gd'], table[t]['gf']), reverse=True)
-        group_winners[grp] = sorted_teams[0]
-        group_runners[grp] = sorted_teams[1]
+def sim_32_team_tournaments(groups_dict, n, rng=None):
+    """
+    Generic 32-team World Cup Simulator (Used from 1998 to 2022), n tournaments at once.
+    Every round is one sim.sim_matches call; all draws come from `rng`.
+    Returns TEAM_REGISTRY ids: champion (n,), finalists (n, 2), semifinalists (n, 4).
+    """
+    if rng is None: rng = np.random
+    letters = sorted(groups_dict)
+    ids = sim.get_team_ids([t for grp in letters for t in groups_dict[grp]]).reshape(len(letters), 4)
 
-    # Standard 32-team Knockout Bracket mapping
-    ro16_matches = [
-        (group_winners['A'], group_runners['B']), (group_winners['C'], group_runners['D']),
-        (group_winners['E'], group_runners['F']), (group_winners['G'], group_runners['H']),
-        (group_winners['B'], group_runners['A']), (group_winners['D'], group_runners['C']),
-        (group_winners['F'], group_runners['E']), (group_winners['H'], group_runners['G'])
-    ]
-    
-    def play_ko(t1, t2):
-        w, _, _, _ = sim.sim_match(t1, t2, knockout=True)
-        return w
+    # 1. Group stage: all 6 x 8 fixtures of every tournament in one batch
+    home = np.repeat(np.array([ids[g, i] for g in range(len(letters)) for i, _ in GROUP_PAIRS])[None, :], n, axis=0)
+    away = np.repeat(np.array([ids[g, j] for g in range(len(letters)) for _, j in GROUP_PAIRS])[None, :], n, axis=0)
+    _, g1, g2, _ = sim.sim_matches(home.ravel(), away.ravel(), False, rng)
+    g1, g2 = g1.reshape(n, -1), g2.reshape(n, -1)
 
-    quarters = [play_ko(t1, t2) for t1, t2 in ro16_matches]
-    semis = [play_ko(quarters[i], quarters[i+1]) for i in range(0, len(quarters), 2)]
-    finalists = [play_ko(semis[i], semis[i+1]) for i in range(0, len(semis), 2)]
-    champion = play_ko(finalists[0], finalists[1])
-    
-    return champion, set(finalists), set(semis)
+    shape = (n, len(letters), 4)
+    pts, gd, gf = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    for m, (g, (i, j)) in enumerate((g, pair) for g in range(len(letters)) for pair in GROUP_PAIRS):
+        a, b = g1[:, m], g2[:, m]
+        pts[:, g, i] += np.where(a > b, 3, np.where(a == b, 1, 0))
+        pts[:, g, j] += np.where(b > a, 3, np.where(a == b, 1, 0))
+        gd[:, g, i] += a - b
+        gd[:, g, j] += b - a
+        gf[:, g, i] += a
+        gf[:, g, j] += b
+
+    # Points, goal difference, goals scored, then a random draw of lots
+    order = np.lexsort((rng.random(shape), gf, gd, pts), axis=-1)
+    ranked = np.take_along_axis(np.broadcast_to(ids, shape), order, axis=-1)
+    winners = {grp: ranked[:, g, -1] for g, grp in enumerate(letters)}
+    runners = {grp: ranked[:, g, -2] for g, grp in enumerate(letters)}
+
+    # 2. Knockouts: one batch per round
+    def play_round(t1, t2):
+        w, _, _, _ = sim.sim_matches(t1.ravel(), t2.ravel(), True, rng)
+        return w.reshape(t1.shape)
+
+    ro16 = np.stack([winners[w] for w, _ in RO16_BRACKET], axis=1), np.stack([runners[r] for _, r in RO16_BRACKET], axis=1)
+    quarters = play_round(*ro16)
+    semis = play_round(quarters[:, 0::2], quarters[:, 1::2])
+    finalists = play_round(semis[:, 0::2], semis[:, 1::2])
+    champion = play_round(finalists[:, :1], finalists[:, 1:])[:, 0]
+    return champion, finalists, semis
 
 async def run_sim_backtest(event):
     out_div = js.document.getElementById("validation-text")
@@ -160,7 +155,7 @@ async def run_sim_backtest(event):
         btn.disabled = True
         btn.innerHTML = "<span class='loader-circle' style='width:12px; height:12px; border-width:2px; display:inline-block; margin:0 8px -2px 0;'></span> Running..."
 
-    out_div.innerHTML = f"Step 1: Calculating historical Elo (1872 - {t_data['name']})..."
+    out_div.innerHTML = f"Step 1: Loading historical Elo (as of {t_data['cutoff_date']})..."
     chart_div.innerHTML = ""
     if prog_container: 
         prog_container.style.display = "block"
@@ -178,34 +173,40 @@ async def run_sim_backtest(event):
         # Override with historic Elos
         for t in t_data['groups']:
             for team in t_data['groups'][t]:
-                if team in elo_historic:
-                    if team not in sim.TEAM_STATS:
-                        sim.TEAM_STATS[team] = {
+                slug = sim.get_slug(team)
+                if slug in elo_historic:
+                    if slug not in sim.TEAM_STATS:
+                        sim.TEAM_STATS[slug] = {
                             'elo': 1200, 'off': 1.0, 'def': 1.0, 'matches': 0, 'clean_sheets': 0, 'btts': 0,
                             'gf_avg': 0, 'ga_avg': 0, 'penalties': 0, 'first_half': 0, 'late_goals': 0, 'total_goals_recorded': 0,
                             'form': [], 'notable_results': [], 'vs_elite': [0, 0, 0], 'vs_stronger': [0, 0, 0],
                             'vs_similar': [0, 0, 0], 'vs_weaker': [0, 0, 0], 'upsets_major_won': 0, 'upsets_minor_won': 0,
                             'upsets_major_lost': 0, 'upsets_minor_lost': 0
                         }
-                    sim.TEAM_STATS[team]['elo'] = elo_historic[team]
+                    sim.TEAM_STATS[slug]['elo'] = elo_historic[slug]
         
         # 3. RUN SIMULATIONS
         out_div.innerHTML = f"Step 2: Simulating {t_data['name']} {sim_count:,} times..."
-        stats = {} 
-        for i in range(sim_count):
-            champ, finalists, semifinalists = sim_32_team_tournament(t_data['groups'])
+        # Chunk k of the run draws from simulation_rng(seed, k): any chunk can be replayed on its own
+        seed = np.random.SeedSequence().entropy
+        js.console.log(f"Backtest {t_data['name']} seed: {seed}")
+        chunk = max(1, sim_count // 50)
+        size = len(sim.TEAM_REGISTRY)
+        counts = {'win': np.zeros(size, dtype=np.int64), 'final': np.zeros(size, dtype=np.int64), 'semi': np.zeros(size, dtype=np.int64)}
+        for k, start in enumerate(range(0, sim_count, chunk)):
+            n = min(chunk, sim_count - start)
+            champ, finalists, semifinalists = sim_32_team_tournaments(t_data['groups'], n, rng=sim.simulation_rng(seed, k))
+            for key, ids in (('win', champ), ('final', finalists), ('semi', semifinalists)):
+                ids = ids.ravel()
+                counts[key] += np.bincount(ids[ids >= 0], minlength=size)
             
-            def track(t, key):
-                if t not in stats: stats[t] = {'win':0, 'final':0, 'semi':0}
-                stats[t][key] += 1
-                
-            track(champ, 'win')
-            for t in finalists: track(t, 'final')
-            for t in semifinalists: track(t, 'semi')
-            
-            if i % max(1, sim_count // 50) == 0:
-                if prog_bar: prog_bar.style.width = f"{int((i / sim_count) * 100)}%"
-                await asyncio.sleep(0.01)
+            if prog_bar: prog_bar.style.width = f"{int(((start + n) / sim_count) * 100)}%"
+            await asyncio.sleep(0.01)
+
+        stats = {
+            sim.TEAM_REGISTRY.slug_of(i): {key: int(counts[key][i]) for key in counts}
+            for i in np.flatnonzero(counts['semi'])
+        }
 
         if prog_bar: prog_bar.style.width = "100%"
         await asyncio.sleep(0.2)
@@ -5,6 +5,7 @@ import gc
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import simulation_engine as sim
+import pyodide_adapter
 from pyodide.ffi import create_proxy
 from pyscript import display
 import random
@@ -19,11 +20,6 @@ BULK_SORT_COL = "win"
 BULK_SORT_DESC = True
 BULK_TABLE_FORMAT = "pct"
 
-def calculate_ci(count, total):
-    p = count / total if total > 0 else 0
-    margin = 1.96 * np.sqrt(p * (1 - p) / total) * 100 if total > 0 else 0
-    return margin
-
 def toggle_dark_mode(event):
     html = js.document.documentElement
     btn = js.document.getElementById("dark-mode-btn")
@@ -63,26 +59,35 @@ async def initialize_app():
     
     try:
         apply_saved_theme()
-        sim.DATA_DIR = "."
         
         status_el.innerHTML = "Step 1/5: Loading CSV Files"
         await asyncio.sleep(0.1)
-        stats, profiles, avg_goals, results_df = sim.initialize_engine()
-        sim.TEAM_STATS = stats
-        sim.TEAM_PROFILES = profiles
-        sim.AVG_GOALS = avg_goals
-        
-        status_el.innerHTML = "Step 2/5: Analyzing Team Signatures..."
-        await asyncio.sleep(0.1)
-        sim.engineer_team_signatures(results_df) 
-        
-        status_el.innerHTML = "Step 3/5: Calculating Confederation Strength..."
-        await asyncio.sleep(0.1)
-        sim.calculate_confed_strength(results_df) 
+        # Snapshots only pay off when IndexedDB can keep them across reloads
+        await pyodide_adapter.mount_snapshot_store()
+        snapshot_key = sim.compute_snapshot_key() if sim.SNAPSHOT_PERSISTENT else None
         
-        status_el.innerHTML = "Step 4/5: Precomputing Match Data..."
-        await asyncio.sleep(0.1)
-        sim.precompute_match_data()
+        if snapshot_key and sim.load_engine_snapshot(key=snapshot_key):
+            status_el.innerHTML = "Step 4/5: Restored Engine Snapshot..."
+            await asyncio.sleep(0.1)
+        else:
+            stats, profiles, avg_goals, results_df = sim.initialize_engine()
+            sim.TEAM_STATS = stats
+            sim.TEAM_PROFILES = profiles
+            sim.AVG_GOALS = avg_goals
+            
+            status_el.innerHTML = "Step 2/5: Analyzing Team Signatures..."
+            await asyncio.sleep(0.1)
+            sim.engineer_team_signatures(results_df) 
+            
+            status_el.innerHTML = "Step 3/5: Calculating Confederation Strength..."
+            await asyncio.sleep(0.1)
+            sim.calculate_confed_strength(results_df) 
+            
+            status_el.innerHTML = "Step 4/5: Precomputing Match Data..."
+            await asyncio.sleep(0.1)
+            sim.precompute_match_data()
+            if snapshot_key and sim.save_engine_snapshot(key=snapshot_key):
+                await pyodide_adapter.persist_snapshot_store()
         
         status_el.innerHTML = "Step 5/5: Finalizing..."
         # Skip heavy UI building until after the loading screen is hidden
@@ -653,7 +658,14 @@ async def run_single_sim(event):
     await asyncio.sleep(0.02)
     
     try:
-        result = sim.run_simulation(fast_mode=False)
+        # Seeded like the bulk runner: the same seed replays this run (it is bulk simulation #0)
+        seed_el = js.document.getElementById("bulk-seed")
+        seed = int(seed_el.value) if seed_el and str(seed_el.value).strip() else None
+        seed = np.random.SeedSequence(seed).entropy
+        js.console.log(f"Single simulation seed: {seed}")
+
+        result = sim.run_simulation(fast_mode=False, rng=sim.simulation_rng(seed, 0))
+        result['seed'] = seed
         LAST_SIM_RESULTS = result 
         
         champion = result["champion"]
@@ -661,6 +673,8 @@ async def run_single_sim(event):
         bracket_data = result["bracket_data"]
         
         js.document.getElementById("visual-champion-name").innerText = champion.upper()
+        seed_label = js.document.getElementById("visual-seed")
+        if seed_label: seed_label.innerText = f"Seed: {seed}"
 
         groups_html = ""
         group_names = [] 
@@ -768,6 +782,12 @@ async def run_bulk_sim(event):
     out_div = js.document.getElementById("bulk-results")
     if not num_el or not out_div: return
     num = int(num_el.value)
+
+    # One SeedSequence per bulk run; simulation #i draws from its own spawned stream,
+    # so any single tournament can be replayed with sim.simulation_rng(seed, i)
+    seed_el = js.document.getElementById("bulk-seed")
+    seed = int(seed_el.value) if seed_el and str(seed_el.value).strip() else None
+    seed = np.random.SeedSequence(seed).entropy
     
     team_stats = {}   
     group_mapping = {} 
@@ -824,7 +844,7 @@ async def run_bulk_sim(event):
 
     try:
         for i in range(num):
-            res = sim.run_simulation(fast_mode=False, quiet=True)
+            res = sim.run_simulation(fast_mode=False, quiet=True, rng=sim.simulation_rng(seed, i))
             
             all_brackets.append(res['bracket_data']) # NEW
             
@@ -927,7 +947,7 @@ async def run_bulk_sim(event):
         top_brackets = [x['bracket'] for x in sorted_unique[:5]]
 
         BULK_STATE = {
-            'num': num, 'stats': team_stats, 'matchups': matchups, 
+            'num': num, 'seed': seed, 'stats': team_stats, 'matchups': matchups, 
             'goals': goals_tracker, 'ga': ga_tracker, 'groups': group_mapping, 'chaos': chaos_events,
             'h2h': h2h_tracker, 'top_brackets': top_brackets
         }
@@ -1050,6 +1070,7 @@ def build_bulk_dashboard():
             <div style="font-size:0.75em; text-transform:uppercase; color:var(--text-light); font-weight:700;">Chaos Index</div>
             <div style="font-size:1.5em; font-weight:900; color:var(--text-main); margin:5px 0;">{chaos_desc}</div>
             <div style="font-size:0.8em; color:var(--text-light);">Upset Probability: {chaos_pct:.1f}%</div>
+            <div style="font-size:0.7em; color:var(--text-light); margin-top:4px;">Seed: {state.get('seed', '-')}</div>
         </div>
         <div class="dashboard-card" style="margin:0; border-left:4px solid var(--accent-gold);">
             <div style="font-size:0.75em; text-transform:uppercase; color:var(--text-light); font-weight:700;">Top Dark Horse</div>
@@ -1335,43 +1356,21 @@ async def run_matchup_analysis(event):
     team_b = js.document.getElementById("matchup-team-b").value
     out_div = js.document.getElementById("matchup-results-container")
     
-    try:
-        sim_count = int(js.document.getElementById("matchup-sim-count").value)
-        sim_count = max(1, min(100000, sim_count)) 
-    except:
-        sim_count = 10000
-    
     if team_a == team_b:
         out_div.innerHTML = "<div style='color:red; text-align:center; padding:20px; font-weight:bold;'>Please select two different teams.</div>"
         return
 
-    out_div.innerHTML = f"<div style='text-align:center; padding:50px;'><div class='loader-circle' style='border-top-color:var(--accent-blue); margin: 0 auto 20px;'></div>Simulating {sim_count:,} Matches...</div>"
-    await asyncio.sleep(0.05) 
-
     try:
-        a_wins, b_wins, draws = 0, 0, 0
-        a_goals, b_goals = 0, 0
-        scorelines = {}
-
-        for _ in range(sim_count):
-            res, g1, g2 = sim.sim_match(team_a, team_b, knockout=False)
-            if res == team_a: a_wins += 1
-            elif res == team_b: b_wins += 1
-            else: draws += 1
-            a_goals += g1
-            b_goals += g2
-            score_str = f"{g1}-{g2}"
-            scorelines[score_str] = scorelines.get(score_str, 0) + 1
-
-        p_a = (a_wins / sim_count) * 100
-        p_d = (draws / sim_count) * 100
-        p_b = (b_wins / sim_count) * 100
-        ci_a = calculate_ci(a_wins, sim_count)
-        ci_d = calculate_ci(draws, sim_count)
-        ci_b = calculate_ci(b_wins, sim_count)
-        avg_ga = a_goals / sim_count
-        avg_gb = b_goals / sim_count
-        sorted_scores = sorted(scorelines.items(), key=lambda x: x[1], reverse=True)[:3]
+        # Exact probabilities from the closed-form goal model (no sampling needed)
+        probs = sim.match_probabilities(team_a, team_b, knockout=False)
+        p_a = probs['win'] * 100
+        p_d = probs['draw'] * 100
+        p_b = probs['loss'] * 100
+        avg_ga, avg_gb = probs['xg']
+
+        score_matrix = probs['scores']
+        top_idx = np.argsort(score_matrix, axis=None)[::-1][:3]
+        sorted_scores = [(f"{i}-{j}", score_matrix[i, j]) for i, j in zip(*np.unravel_index(top_idx, score_matrix.shape))]
 
         sa = sim.TEAM_STATS.get(team_a, {})
         sb = sim.TEAM_STATS.get(team_b, {})
@@ -1411,11 +1410,11 @@ async def run_matchup_analysis(event):
         html = f"""
         <div style="display:grid; grid-template-columns: 1fr 1fr; gap:20px; margin-bottom:20px;">
             <div class="dashboard-card" style="margin-bottom:0;">
-                <h3 style="margin-top:0; color:var(--text-light); text-transform:uppercase; font-size:0.85em;">Match Simulation ({sim_count:,} runs)</h3>
+                <h3 style="margin-top:0; color:var(--text-light); text-transform:uppercase; font-size:0.85em;">Match Probabilities (Exact)</h3>
                 <div style="display:flex; justify-content:space-between; margin-bottom:10px; font-weight:800; font-size:1.2em;">
-                    <div style="color:#3b82f6;">{name_a}<br><span style="font-size:0.6em; font-weight:400;"><span class='ci-value' data-ci='95% CI: ±{ci_a:.1f}%'>{p_a:.1f}%</span></span></div>
-                    <div style="color:#64748b; font-size:0.8em; align-self:center;">DRAW<br><span style="font-size:0.7em;"><span class='ci-value' data-ci='95% CI: ±{ci_d:.1f}%'>{p_d:.1f}%</span></span></div>
-                    <div style="color:#ef4444;">{name_b}<br><span style="font-size:0.6em; font-weight:400;"><span class='ci-value' data-ci='95% CI: ±{ci_b:.1f}%'>{p_b:.1f}%</span></span></div>
+                    <div style="color:#3b82f6;">{name_a}<br><span style="font-size:0.6em; font-weight:400;">{p_a:.1f}%</span></div>
+                    <div style="color:#64748b; font-size:0.8em; align-self:center;">DRAW<br><span style="font-size:0.7em;">{p_d:.1f}%</span></div>
+                    <div style="color:#ef4444;">{name_b}<br><span style="font-size:0.6em; font-weight:400;">{p_b:.1f}%</span></div>
                 </div>
                 <div style="width:100%; height:30px; display:flex; border-radius:8px; overflow:hidden;">
                     <div style="width:{p_a}%; background:#3b82f6;"></div>
@@ -1437,8 +1436,8 @@ async def run_matchup_analysis(event):
                 <h3 style="margin-top:0; color:var(--text-light); text-transform:uppercase; font-size:0.85em;">Likely Scorelines</h3>
                 <div style="display:flex; flex-direction:column; gap:10px; margin-top:15px;">
         """
-        for i, (score, count) in enumerate(sorted_scores):
-            pct = (count/sim_count)*100
+        for i, (score, prob) in enumerate(sorted_scores):
+            pct = prob * 100
             html += f"""
             <div class="scoreline-row">
                 <div class="scoreline-label">{score}</div>
@@ -0,0 +1,50 @@
+### `pyodide_adapter.py`
+# Browser bindings for the engine. simulation_engine.py itself is plain CPython;
+# importing this module (from main.py) routes its logging to the JS console and
+# points it at the files PyScript fetched into the virtual filesystem.
+import js
+import simulation_engine as sim
+
+sim.set_logger(js.console)
+sim.DATA_DIR = "."
+
+# --- Engine snapshot persistence ---
+# Pyodide's MEMFS is wiped on every page load, so the engine snapshot lives on an
+# IndexedDB-backed mount (IDBFS) that is synced in before loading and out after saving.
+import asyncio
+import pyodide_js
+from pyodide.ffi import create_once_callable
+
+SNAPSHOT_MOUNT = "/engine_cache"
+
+def _syncfs(populate):
+    """FS.syncfs as an awaitable (populate=True: IndexedDB -> FS, False: FS -> IndexedDB)"""
+    future = asyncio.get_event_loop().create_future()
+    def done(err=None):
+        if future.done(): return
+        if err: future.set_exception(RuntimeError(str(err)))
+        else: future.set_result(None)
+    pyodide_js.FS.syncfs(populate, create_once_callable(done))
+    return future
+
+async def mount_snapshot_store():
+    """Mounts IDBFS for the snapshot and loads what the last visit stored. Returns True if persistent."""
+    if sim.SNAPSHOT_PERSISTENT: return True
+    try:
+        FS = pyodide_js.FS
+        if not FS.analyzePath(SNAPSHOT_MOUNT).exists: FS.mkdir(SNAPSHOT_MOUNT)
+        FS.mount(FS.filesystems.IDBFS, js.Object.new(), SNAPSHOT_MOUNT)
+        await _syncfs(True)
+    except Exception as e:
+        js.console.warn(f"Engine snapshot cache unavailable, building from scratch: {e}")
+        return False
+    sim.SNAPSHOT_DIR = SNAPSHOT_MOUNT
+    sim.SNAPSHOT_PERSISTENT = True
+    return True
+
+async def persist_snapshot_store():
+    """Flushes a freshly saved snapshot to IndexedDB. Failures only cost the next warm start."""
+    try:
+        await _syncfs(False)
+    except Exception as e:
+        js.console.warn(f"Could not persist engine snapshot: {e}")
@@ -1,10 +1,15 @@
 ### `simulation_engine.py`
 import pandas as pd
 import numpy as np
-import random
 import math
-import js
-from pyodide.http import open_url
+import os
+import hashlib
+import pickle
+import json
+import difflib
+import bisect
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 def calculate_recency_weight(match_date, latest_date):
     """
@@ -16,41 +21,48 @@ def calculate_recency_weight(match_date, latest_date):
 
 import re
 import unicodedata
+import functools
+
+# THE SYNONYM MAP (The "Fix-All" Dictionary)
+# This maps common variations to a single 'Master Name'
+TEAM_SYNONYMS = {
+    # CONCACAF
+    'usa': 'united states', 'u.s.a.': 'united states', 'united states of america': 'united states',
+    'curacao': 'curaçao',
+    
+    # AFC
+    'south korea': 'korea republic', 'korea': 'korea republic', 'rep of korea': 'korea republic',
+    'iran': 'ir iran', 'islamic republic of iran': 'ir iran',
+    'uae': 'united arab emirates',
+    'kyrgyzstan': 'kyrgyz republic',
+    
+    # UEFA
+    'czechia': 'czech republic',
+    'turkiye': 'turkey', 'türkiye': 'turkey',
+    'ireland': 'republic of ireland', 'eire': 'republic of ireland',
+    
+    # CAF
+    "cote d'ivoire": "cote d'ivoire", 'ivory coast': "cote d'ivoire",
+    'dr congo': 'congo dr', 'democratic republic of the congo': 'congo dr',
+    'cape verde': 'cabo verde',
+}
+
+NON_ALNUM_RE = re.compile(r'[^a-z0-9]')
+PARENS_RE = re.compile(r'\(.*?\)')
+NON_ALPHA_RE = re.compile(r'[^a-z\s]')
 
 def get_slug(name):
     """Accents, Synonyms, and Formatting handler"""
     if not name: return ""
-    
+    return _team_slug(str(name))
+
+@functools.lru_cache(maxsize=None)
+def _team_slug(name):
     # 1. Basic Cleaning
-    name = str(name).strip().lower()
-
-    # 2. THE SYNONYM MAP (The "Fix-All" Dictionary)
-    # This maps common variations to a single 'Master Name'
-    synonyms = {
-        # CONCACAF
-        'usa': 'united states', 'u.s.a.': 'united states', 'united states of america': 'united states',
-        'curacao': 'curaçao',
-        
-        # AFC
-        'south korea': 'korea republic', 'korea': 'korea republic', 'rep of korea': 'korea republic',
-        'iran': 'ir iran', 'islamic republic of iran': 'ir iran',
-        'uae': 'united arab emirates',
-        'kyrgyzstan': 'kyrgyz republic',
-        
-        # UEFA
-        'czechia': 'czech republic',
-        'turkiye': 'turkey', 'türkiye': 'turkey',
-        'ireland': 'republic of ireland', 'eire': 'republic of ireland',
-        
-        # CAF
-        "cote d'ivoire": "cote d'ivoire", 'ivory coast': "cote d'ivoire",
-        'dr congo': 'congo dr', 'democratic republic of the congo': 'congo dr',
-        'cape verde': 'cabo verde',
-    }
-    
-    # Check if the name is a known synonym
-    if name in synonyms:
-        name = synonyms[name]
+    name = name.strip().lower()
+
+    # 2. Check if the name is a known synonym
+    name = TEAM_SYNONYMS.get(name, name)
 
     # 3. UNICODE NORMALIZATION (Turns 'ç' into 'c')
     name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('utf-8')
@@ -58,22 +70,26 @@ def get_slug(name):
     # 4. FINAL SLUG (Remove all non-alphanumeric characters)
     # This turns 'Cote d'Ivoire' into 'cotedivoire'
     # and 'United States' into 'unitedstates'
-    return re.sub(r'[^a-z0-9]', '', name.lower())
+    return NON_ALNUM_RE.sub('', name.lower())
 
 def get_player_slug(name):
     """Aggressive slugifying for player names to maximize matching across disjoint datasets"""
     if not name or pd.isna(name): return ""
-    n = str(name).strip().lower()
+    return _player_slug(str(name))
+
+@functools.lru_cache(maxsize=None)
+def _player_slug(name):
+    n = name.strip().lower()
     
     # Remove accents
     n = unicodedata.normalize('NFKD', n).encode('ascii', 'ignore').decode('utf-8')
-    n = re.sub(r'\(.*?\)', '', n) # Remove text in parenthesis
+    n = PARENS_RE.sub('', n) # Remove text in parenthesis
     
     # 1. Replace hyphens and dots with spaces so we can cleanly separate the name
     n = n.replace('-', ' ').replace('.', ' ')
     
     # 2. Keep ONLY letters and spaces
-    n = re.sub(r'[^a-z\s]', '', n)
+    n = NON_ALPHA_RE.sub('', n)
     
     # 3. Remove common suffixes safely
     n = ' ' + n + ' '
@@ -87,6 +103,16 @@ def get_player_slug(name):
     
     return "".join(tokens)
 
+def slug_column(values, slug_fn=get_slug, name_map=None):
+    """
+    Column-level slugging: slug_fn runs once per distinct value (NaN included) and is mapped back.
+    name_map renames values first (e.g. historical names), which also works on categoricals.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    name_map = name_map or {}
+    slugs = np.array([slug_fn(name_map.get(v, v)) for v in uniques], dtype=object)
+    return pd.Series(slugs[codes], index=values.index, name=values.name)
+
 def map_pos_to_unit(pos_str):
     """Maps varied position acronyms from squad files into our 4 core units"""
     p = str(pos_str).upper()
@@ -143,12 +169,57 @@ def parse_formation_to_targets(fmt_str):
 # We will store the 'Pretty' version of names here as we find them
 PRETTY_NAMES = {}
 
+class TeamRegistry:
+    """
+    Interns team slugs to dense integer ids (0..n-1) once at load time, so
+    per-team numbers can live in flat NumPy arrays indexed by team id.
+    """
+    def __init__(self, slugs=()):
+        self.slugs = []
+        self.ids = {}
+        for slug in slugs:
+            self.intern(slug)
+
+    def __len__(self):
+        return len(self.slugs)
+
+    def __contains__(self, slug):
+        return slug in self.ids
+
+    def intern(self, slug):
+        """Returns the id of an already-slugged team, adding it if new"""
+        team_id = self.ids.get(slug)
+        if team_id is None:
+            team_id = len(self.slugs)
+            self.ids[slug] = team_id
+            self.slugs.append(slug)
+        return team_id
+
+    def id_of(self, name):
+        """Id for a slug or any raw/pretty name, -1 if unknown"""
+        team_id = self.ids.get(name)
+        if team_id is None:
+            team_id = self.ids.get(get_slug(name), -1)
+        return team_id
+
+    def ids_of(self, names):
+        return np.array([self.id_of(n) for n in names], dtype=np.int64)
+
+    def slug_of(self, team_id):
+        return self.slugs[team_id]
+
+    def pretty_of(self, team_id):
+        slug = self.slugs[team_id]
+        return PRETTY_NAMES.get(slug, slug.title())
+
+TEAM_REGISTRY = TeamRegistry()
+
 R32_LOOKUP = {}
 
 def load_r32_combinations():
     global R32_LOOKUP
     try:
-        df = pd.read_csv("possible_matchups.csv")
+        df = load_dataset("possible_matchups.csv")
         for _, row in df.iterrows():
             combo_str = str(row.get('Combination', '')).strip().upper()
             if not combo_str or combo_str == 'NAN': continue
@@ -168,19 +239,46 @@ def load_r32_combinations():
                 'K': str(row['1K'])[-1].upper(),
                 'L': str(row['1L'])[-1].upper()
             }
-        js.console.log(f"Loaded {len(R32_LOOKUP)} 3rd-place combinations from CSV.")
+        LOGGER.log(f"Loaded {len(R32_LOOKUP)} 3rd-place combinations from CSV.")
     except Exception as e:
-        js.console.error(f"Error loading possible_matchups.csv: {e}")
+        LOGGER.error(f"Error loading possible_matchups.csv: {e}")
 
 # =============================================================================
 # --- PART 1: SETUP & DATA LOADING ---
 # =============================================================================
 
 DATA_DIR = "." 
+DATA_PATH_RESOLVER = None
+# Independent build stages run on threads under CPython (Pyodide has none: one after another there)
+INIT_PARALLEL = sys.platform != 'emscripten'
+
+class ConsoleLogger:
+    """Default logger (stdout/stderr). Under Pyodide, pyodide_adapter swaps in js.console."""
+    def log(self, msg): print(msg)
+    def error(self, msg): print(msg, file=sys.stderr)
+
+LOGGER = ConsoleLogger()
+
+def set_logger(logger):
+    """Any object with .log(msg) and .error(msg), e.g. js.console or a logging.Logger adapter"""
+    global LOGGER
+    LOGGER = logger
+
+def set_data_resolver(resolver):
+    """resolver(file_name) -> path or URL-backed local path; None restores DATA_DIR joining"""
+    global DATA_PATH_RESOLVER
+    DATA_PATH_RESOLVER = resolver
+
+def resolve_data_path(file):
+    if DATA_PATH_RESOLVER is not None: return DATA_PATH_RESOLVER(file)
+    return os.path.join(DATA_DIR, file)
 
 TEAM_STATS = {}
 TEAM_PROFILES = {}
 TEAM_HISTORY = {}
+ELO_CHECKPOINTS = {}
+RESULTS_TABLE = None  # parsed, slugged results.csv from the last build (shared by later steps)
+ENGINE_STATE = {}
 ADVANCED_TEAM_DATA = {} 
 AVG_GOALS = 2.91
 calculated_hfa = 0.0
@@ -269,51 +367,227 @@ FINALIZED_SLOTS = {
 TEAM_TALENT = {}
 TEAM_FORMATIONS = {}
 
-def load_data():
-    import unicodedata
+# Declared per-file schemas, parsed in a single read_csv pass:
+#   usecols - only the columns the simulation needs
+#   dtype   - explicit dtypes (scores as small ints, flags as bools)
+#   dates   - ISO dates parsed to datetime64 (bad values become NaT)
+#   teams   - team columns: categoricals with stripped categories, registered in PRETTY_NAMES
+# Undeclared text columns are still stripped.
+CSV_SCHEMAS = {
+    "results.csv": {
+        'usecols': ['date', 'home_team', 'away_team', 'home_score', 'away_score', 'tournament', 'neutral'],
+        'dtype': {'home_score': 'int16', 'away_score': 'int16', 'tournament': 'category', 'neutral': 'bool'},
+        'dates': ['date'],
+        'teams': ['home_team', 'away_team'],
+    },
+    "goalscorers.csv": {
+        'usecols': ['date', 'team', 'penalty', 'minute'],
+        'dtype': {'penalty': 'bool', 'minute': 'str'},
+        'dates': ['date'],
+        'teams': ['team'],
+    },
+    "former_names.csv": {'dates': ['start_date', 'end_date']},
+    "Formations.csv": {'teams': ['Nation']},
+    "Player_Data.csv": {'teams': ['Nation']},
+    "Current_Squad.csv": {'teams': ['Team']},
+    "Recent_Call_Ups.csv": {'teams': ['Team']},
+}
+# Used when a typed column has missing values (e.g. unplayed fixtures without a score)
+NULLABLE_DTYPES = {'int16': 'Int16', 'bool': 'boolean'}
+
+def strip_categories(col):
+    stripped = col.cat.categories.str.strip()
+    if stripped.is_unique:
+        return col.cat.rename_categories(stripped)
+    return col.map(dict(zip(col.cat.categories, stripped))).astype('category')
+
+def register_pretty_names(col):
+    """Display name for every category of a team column, in order of first appearance"""
+    codes = col.cat.codes.to_numpy()
+    for val in col.cat.categories[pd.unique(codes[codes >= 0])]:
+        slug = get_slug(val)
+        if slug and slug not in PRETTY_NAMES:
+            PRETTY_NAMES[slug] = val
+
+def text_columns(df):
+    """Plain text columns: object dtype before pandas 3, the str dtype from 3.0 (select_dtypes('str') raises before 3.0)"""
+    return [col for col, dt in df.dtypes.items()
+            if dt == object or (pd.api.types.is_string_dtype(dt) and not isinstance(dt, pd.CategoricalDtype))]
+
+def read_csv_schema(file, path):
+    schema = CSV_SCHEMAS.get(file, {})
+    dtype = dict(schema.get('dtype', {}), **{c: 'category' for c in schema.get('teams', [])})
+
+    def parse(dtype):
+        kwargs = dict(on_bad_lines='skip', usecols=schema.get('usecols'), dtype=dtype)
+        try:
+            return pd.read_csv(path, encoding='utf-8-sig', **kwargs)
+        except UnicodeDecodeError:
+            return pd.read_csv(path, encoding='latin1', **kwargs)
+
     try:
-        def safe_read(file):
-            # Only load columns required for simulation logic
-            cols = None
-            if file == "results.csv":
-                cols = ['date', 'home_team', 'away_team', 'home_score', 'away_score', 'tournament', 'neutral']
-            elif file == "goalscorers.csv":
-                cols = ['date', 'team', 'penalty', 'minute']
-            
-            try:
-                df = pd.read_csv(file, encoding='utf-8-sig', on_bad_lines='skip', usecols=cols)
-            except:
-                df = pd.read_csv(file, encoding='latin1', on_bad_lines='skip', usecols=cols)
-            
-            for col in df.select_dtypes(include=['object']):
-                if 'team' in col.lower() or 'nation' in col.lower():
-                    for val in df[col].dropna().unique():
-                        slug = get_slug(val)
-                        if slug and slug not in PRETTY_NAMES:
-                            PRETTY_NAMES[slug] = str(val).strip()
-                df[col] = df[col].str.strip()
-            return df
-
-        results_df = safe_read("results.csv")
-        goalscorers_df = safe_read("goalscorers.csv")
-        former_names_df = safe_read("former_names.csv")
-        formation_df = safe_read("Formations.csv")
-        player_df = safe_read("Player_Data.csv")
-        
-        # New Call-up Data
-        current_df = safe_read("Current_Squad.csv")
-        recent_df = safe_read("Recent_Call_Ups.csv")
-        
-        return results_df, goalscorers_df, former_names_df, player_df, formation_df, current_df, recent_df
-    except Exception as e:
-        js.console.error(f"DATA LOAD ERROR: {e}")
-        raise RuntimeError(f"Could not load CSV files: {e}")
+        df = parse(dtype)
+    except ValueError:
+        df = parse({c: NULLABLE_DTYPES.get(d, d) for c, d in dtype.items()})
+
+    for col in schema.get('dates', []):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format='%Y-%m-%d', errors='coerce')
+    for col in text_columns(df):
+        if col not in dtype:
+            df[col] = df[col].str.strip()
+    for col in df.select_dtypes(include=['category']):
+        df[col] = strip_categories(df[col])
+    return df
+
+DATASET_CACHE = {}  # resolved path -> ((mtime_ns, size), parsed frame)
+
+# Parse order doubles as PRETTY_NAMES precedence (first file to name a team wins)
+DATA_FILES = [
+    "results.csv", "goalscorers.csv", "former_names.csv", "Formations.csv", "Player_Data.csv",
+    "Current_Squad.csv", "Recent_Call_Ups.csv"
+]
+
+def parse_dataset(file):
+    """Cached parsed frame for a data file. Disk is only read again when its mtime or size changed."""
+    path = resolve_data_path(file)
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = DATASET_CACHE.get(path)
+    if cached is None or cached[0] != signature:
+        cached = DATASET_CACHE[path] = (signature, read_csv_schema(file, path))
+    return cached[1]
+
+def load_dataset(file):
+    """Copy of the parsed frame (callers clean and slug it in place); registers its team names"""
+    df = parse_dataset(file)
+    for col in CSV_SCHEMAS.get(file, {}).get('teams', []):
+        if col in df.columns:
+            register_pretty_names(df[col])
+    return df.copy()
+
+def clear_dataset_cache():
+    DATASET_CACHE.clear()
+
+def load_data(parallel=False):
+    """
+    The seven input frames, parsed in DATA_FILES order. parallel=True parses them on a thread
+    pool instead; off by default since the string conversion holds the GIL and it measured no faster.
+    Every file that fails is reported, then a single RuntimeError is raised.
+    """
+    errors = {}
+    if parallel:
+        with ThreadPoolExecutor(max_workers=len(DATA_FILES)) as pool:
+            futures = {file: pool.submit(parse_dataset, file) for file in DATA_FILES}
+        errors = {file: f.exception() for file, f in futures.items() if f.exception() is not None}
+
+    frames = {}
+    for file in DATA_FILES:
+        if file in errors: continue
+        try:
+            frames[file] = load_dataset(file)
+        except Exception as e:
+            errors[file] = e
+
+    if errors:
+        for file, e in errors.items():
+            LOGGER.error(f"DATA LOAD ERROR ({file}): {e}")
+        raise RuntimeError("Could not load CSV files: " + "; ".join(f"{file}: {e}" for file, e in errors.items()))
+
+    return (frames["results.csv"], frames["goalscorers.csv"], frames["former_names.csv"], frames["Player_Data.csv"],
+            frames["Formations.csv"], frames["Current_Squad.csv"], frames["Recent_Call_Ups.csv"])
+
+NAME_MATCH_CACHE_FILE = "name_match_cache.json"
+NAME_MATCH_CUTOFF = 0.92
+
+class PlayerNameMatcher:
+    """
+    Fuzzy call-up -> player-file slug alignment within one team's roster.
+
+    A trigram index narrows the difflib scan to plausible candidates. Lossless: a ratio >= 0.92
+    between strings of combined length > 4 needs a matching block of 3+ chars (shorter blocks
+    leave an unmatched char between each pair), i.e. a shared trigram.
+    """
+    def __init__(self, slugs):
+        self.slugs = list(slugs)
+        self.exact = set(self.slugs)
+        self._index = None
+        self.fingerprint = hashlib.sha1("\n".join(sorted(self.exact)).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _trigrams(slug):
+        return {slug[i:i + 3] for i in range(len(slug) - 2)}
+
+    def candidates(self, slug):
+        if len(slug) < 3: return self.slugs
+        if self._index is None:
+            self._index = {}
+            for i, s in enumerate(self.slugs):
+                for g in self._trigrams(s): self._index.setdefault(g, set()).add(i)
+        hits = set()
+        for g in self._trigrams(slug): hits |= self._index.get(g, set())
+        return [self.slugs[i] for i in sorted(hits)]
+
+    def match(self, slug):
+        if slug in self.exact: return slug
+        # Strict cutoff (0.92, not 0.8) so "Mohamed Alaa" doesn't turn into "Mohamed Salah"
+        found = difflib.get_close_matches(slug, self.candidates(slug), n=1, cutoff=NAME_MATCH_CUTOFF)
+        return found[0] if found else slug
+
+def load_name_match_cache(path=None):
+    """{team_slug: {'roster': fingerprint, 'matches': {callup_slug: player_slug}}}, empty if missing/stale"""
+    path = path or resolve_data_path(NAME_MATCH_CACHE_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('cutoff') == NAME_MATCH_CUTOFF: return cache.get('teams', {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+def save_name_match_cache(teams, path=None):
+    path = path or resolve_data_path(NAME_MATCH_CACHE_FILE)
+    try:
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({'cutoff': NAME_MATCH_CUTOFF, 'teams': teams}, f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        LOGGER.error(f"Could not save name match cache: {e}")
+
+def align_callup_slugs(team_slugs, player_slugs, player_slugs_by_team):
+    """
+    Maps each call-up slug to the matching player-file slug of the same team (itself if none).
+    Fuzzy results are cached per team and reused while that team's roster is unchanged.
+    """
+    cache = load_name_match_cache()
+    matchers = {}
+    dirty = False
+    aligned = []
+    for t_slug, p_slug in zip(team_slugs, player_slugs):
+        if t_slug not in player_slugs_by_team:
+            aligned.append(p_slug); continue
+        matcher = matchers.get(t_slug)
+        if matcher is None:
+            matcher = matchers[t_slug] = PlayerNameMatcher(player_slugs_by_team[t_slug])
+        if p_slug in matcher.exact:
+            aligned.append(p_slug); continue
+
+        entry = cache.get(t_slug)
+        if entry is None or entry.get('roster') != matcher.fingerprint:
+            entry = cache[t_slug] = {'roster': matcher.fingerprint, 'matches': {}}
+            dirty = True
+        if p_slug not in entry['matches']:
+            entry['matches'][p_slug] = matcher.match(p_slug)
+            dirty = True
+        aligned.append(entry['matches'][p_slug])
+
+    if dirty: save_name_match_cache(cache)
+    return aligned
 
 def calculate_squad_ratings(player_df, formation_df, current_df, recent_df):
     if player_df is None: return {}
     import re
     import numpy as np
-    import difflib
     
     # 1. Clean Player Data
     player_df.columns = [str(c).strip().lower() for c in player_df.columns]
@@ -321,8 +595,8 @@ def calculate_squad_ratings(player_df, formation_df, current_df, recent_df):
     
     # Do NOT default to 68 yet, leave as NaN to calculate true team averages
     player_df['rat'] = pd.to_numeric(player_df['rat'].astype(str).str.extract(r'(\d+)')[0], errors='coerce')
-    player_df['player_slug'] = player_df.get('name', '').apply(get_player_slug)
-    player_df['team_slug'] = player_df.get('nation', '').apply(get_slug)
+    player_df['player_slug'] = slug_column(player_df.get('name', ''), get_player_slug)
+    player_df['team_slug'] = slug_column(player_df.get('nation', ''))
 
     # --- DYNAMIC FALLBACK CALCULATION ---
     # Calculate the median rating for each team to dynamically scale missing players
@@ -338,8 +612,8 @@ def calculate_squad_ratings(player_df, formation_df, current_df, recent_df):
     
     if not callups.empty:
         callups.columns = [str(c).strip().lower() for c in callups.columns]
-        callups['player_slug'] = callups.get('name', '').apply(get_player_slug)
-        callups['team_slug'] = callups.get('team', '').apply(get_slug)
+        callups['player_slug'] = slug_column(callups.get('name', ''), get_player_slug)
+        callups['team_slug'] = slug_column(callups.get('team', ''))
         
         callups['caps'] = pd.to_numeric(callups.get('caps', 0), errors='coerce').fillna(0)
         callups['age'] = pd.to_numeric(callups.get('age', 28), errors='coerce').fillna(28)
@@ -350,23 +624,7 @@ def calculate_squad_ratings(player_df, formation_df, current_df, recent_df):
 
         # Smart Name Alignment
         player_slugs_by_team = player_df.groupby('team_slug')['player_slug'].apply(list).to_dict()
-        
-        def align_slug(row):
-            t_slug = row['team_slug']
-            p_slug = row['player_slug']
-            if t_slug not in player_slugs_by_team: return p_slug
-            
-            valid_slugs = player_slugs_by_team[t_slug]
-            if p_slug in valid_slugs: return p_slug
-                    
-            # Make the spell-checker much stricter (0.92 instead of 0.8) 
-            # so "Mohamed Alaa" doesn't turn into "Mohamed Salah"
-            matches = difflib.get_close_matches(p_slug, valid_slugs, n=1, cutoff=0.92)
-            if matches: return matches[0]
-            
-            return p_slug
-
-        callups['player_slug'] = callups.apply(align_slug, axis=1)
+        callups['player_slug'] = align_callup_slugs(callups['team_slug'].tolist(), callups['player_slug'].tolist(), player_slugs_by_team)
 
         # 3. Merge Datasets
         pool = pd.merge(player_df, callups, on=['team_slug', 'player_slug'], how='outer', suffixes=('', '_c'))
@@ -374,207 +632,184 @@ def calculate_squad_ratings(player_df, formation_df, current_df, recent_df):
         pool = player_df.copy()
         pool['caps'], pool['age'], pool['squad_no'], pool['status'], pool['callup_tier'], pool['captain'] = 0, 28, 999, '', 'None', ''
 
-    def get_merged_val(row, col_name, default_val):
-        val_c = row.get(f'{col_name}_c')
-        if pd.notna(val_c) and str(val_c).strip().upper() != 'NAN' and str(val_c).strip() != '': return val_c
-        val = row.get(col_name)
-        if pd.notna(val) and str(val).strip().upper() != 'NAN' and str(val).strip() != '': return val
-        return default_val
+    def merged_column(col_name, default_val):
+        """Column-wise merge: the call-up value ('<col>_c') wins, then the player-file value, then the default"""
+        out = pd.Series(default_val, index=pool.index, dtype=object)
+        for col in [col_name, f'{col_name}_c']:
+            if col not in pool.columns: continue
+            vals = pool[col].astype(object)
+            text = vals.map(str).str.strip()
+            ok = vals.notna() & (text.str.upper() != 'NAN') & (text != '')
+            out = out.mask(ok, vals)
+        return out
 
-    # 4. Standardize Positional Units & Names
-    def resolve_row(row):
-        name = get_merged_val(row, 'name', 'Unknown Player')
-        
-        # 1. Gather all potential fields that might contain Position or Club data
-        raw_p_pos = str(row.get('position(s)', '')).upper()
-        raw_p_pos2 = str(row.get('pos', '')).upper()
-        raw_p_pos3 = str(row.get('position a', '')).upper()
-        raw_c_pos = str(row.get('pos.', '')).upper()
-        
-        raw_club = str(row.get('club', '')).upper()
-        raw_club_c = str(row.get('club_c', '')).upper()
-        
-        # Combine them all and remove empties
-        all_vals = [raw_p_pos, raw_p_pos2, raw_p_pos3, raw_c_pos, raw_club, raw_club_c]
-        valid_vals = [v.strip() for v in all_vals if v.strip() and v.strip() != 'NAN']
-        
-        # A master list of known position acronyms
-        known_pos = ['GK', 'ST', 'CF', 'FW', 'LW', 'RW', 'AML', 'AMR', 'AMC', 'CAM', 'DM', 'CDM', 'MC', 'CM', 'LM', 'RM', 'CB', 'DC', 'LB', 'RB', 'DL', 'DR', 'LWB', 'RWB', 'WB', 'DEF', 'MID', 'ATT', 'MF', 'DF']
-        
-        pos_cands = []
-        club_cands = []
-        
-        # 2. Smartly sort the text into "Positions" vs "Clubs"
-        for v in valid_vals:
-            # It is a position if it's an exact acronym, or a short comma list (e.g., "DM, MC")
-            if any(p == v for p in known_pos) or (',' in v and len(v) < 15):
-                if v not in pos_cands: pos_cands.append(v)
-            else:
-                if v not in club_cands: club_cands.append(v)
-                
-        # 3. Pick the most descriptive Position
-        detailed_pos = [p for p in pos_cands if ',' in p]
-        if detailed_pos:
-            true_pos = detailed_pos[0]
-        elif pos_cands:
-            true_pos = pos_cands[0]
-        else:
-            true_pos = ""
-            
-        # 4. Pick the most accurate Club
-        if raw_club_c in club_cands:
-            true_club = raw_club_c # Prefer the club from Recent Callups
-        elif club_cands:
-            true_club = club_cands[-1]
-        else:
-            true_club = "Unknown"
-            
-        # 5. Map to Core Unit for engine logic
-        if 'GK' in true_pos or 'GK' == raw_c_pos: unit = 'GK'
-        elif 'DF' in raw_c_pos or 'DEF' in true_pos: unit = 'DEF'
-        elif 'FW' in raw_c_pos or 'ATT' in true_pos: unit = 'ATT'
-        elif 'MF' in raw_c_pos or 'MID' in true_pos: unit = 'MID'
-        else: unit = map_pos_to_unit(true_pos)
-        
-        display_pos = true_pos if true_pos else unit
+    def upper_text(col_name):
+        if col_name not in pool.columns: return pd.Series('', index=pool.index, dtype=object)
+        return pool[col_name].astype(object).map(str).str.upper()
 
-        # --- APPLY DYNAMIC FALLBACK RATING ---
-        t_slug = row.get('team_slug', '')
-        fallback_rat = team_medians.get(t_slug, 64.0) - 2.0
-        
-        try: rat = float(row.get('rat', fallback_rat))
-        except: rat = fallback_rat
-        if pd.isna(rat): rat = fallback_rat 
-        
-        # Format the club name nicely (e.g. "West Ham" instead of "WEST HAM")
-        return pd.Series([name, display_pos, true_club.title(), unit, rat])
-        
-    pool[['display_name', 'display_pos', 'display_club', 'unit', 'rat']] = pool.apply(resolve_row, axis=1)
-
-    # 5. Calculate SELECTION SCORE
-    def calc_score(row):
-        base_rat = row['rat']
-        try: caps = float(get_merged_val(row, 'caps', 0.0))
-        except: caps = 0.0
-        try: age = float(get_merged_val(row, 'age', 28.0))
-        except: age = 28.0
-        try: squad_no = float(get_merged_val(row, 'squad_no', 999.0))
-        except: squad_no = 999.0
-
-        status = str(get_merged_val(row, 'status', '')).lower()
-        tier = str(row.get('callup_tier', 'None'))
-        unit = row['unit']
-        captain = str(get_merged_val(row, 'captain', '')).lower()
-        
-        if 'RET' in status: return -999.0
-        
-        score = base_rat
-        
-        if tier == 'Current': score += 5.0
-        elif tier == 'Recent': score += 2.0
-        
-        if tier == 'Current':
-            if unit == 'GK' and squad_no == 1.0: score += 2.0
-            elif squad_no == 10.0: score += 2.0
-        
-        cap_bonus = min(caps * 0.15, 8.0) 
-        if age >= 34.0:
-            cap_bonus = min(caps * 0.10, 5.0) 
-            score -= (age - 33.0) * 1.0  
-            
-        score += cap_bonus
-            
-        if 'INJ' in status:
-            if caps > 40.0: score -= 3.0
-            else: score -= 10.0
-            
-        if 'captain' in captain:
-            score += 8.0 
-            
-        return score
+    def numeric_column(col_name, default_val):
+        return pd.to_numeric(merged_column(col_name, default_val), errors='coerce').fillna(default_val).to_numpy(dtype=float)
 
-    pool['selection_score'] = pool.apply(calc_score, axis=1)
-    pool = pool[pool['selection_score'] > 0]
+    # 4. Standardize Positional Units & Names
+    # Every field that might hold a position or a club, in priority order
+    raw_c_pos = upper_text('pos.')
+    raw_club_c = upper_text('club_c')
+    fields = [upper_text('position(s)'), upper_text('pos'), upper_text('position a'), raw_c_pos, upper_text('club'), raw_club_c]
+    fields = [f.str.strip() for f in fields]
+
+    # A master list of known position acronyms
+    known_pos = ['GK', 'ST', 'CF', 'FW', 'LW', 'RW', 'AML', 'AMR', 'AMC', 'CAM', 'DM', 'CDM', 'MC', 'CM', 'LM', 'RM', 'CB', 'DC', 'LB', 'RB', 'DL', 'DR', 'LWB', 'RWB', 'WB', 'DEF', 'MID', 'ATT', 'MF', 'DF']
+
+    # It is a position if it's an exact acronym, or a short comma list (e.g., "DM, MC"); anything else is a club
+    true_pos = pd.Series('', index=pool.index, dtype=object)
+    detailed_pos = pd.Series(None, index=pool.index, dtype=object)
+    true_club = pd.Series('UNKNOWN', index=pool.index, dtype=object)
+    club_c_is_cand = pd.Series(False, index=pool.index)
+    for v in reversed(fields):
+        valid = (v != '') & (v != 'NAN')
+        has_comma = v.str.contains(',', regex=False)
+        is_pos = valid & (v.isin(known_pos) | (has_comma & (v.str.len() < 15)))
+        true_pos = true_pos.mask(is_pos, v)                  # first position field wins
+        detailed_pos = detailed_pos.mask(is_pos & has_comma, v)
+        club_c_is_cand |= valid & ~is_pos & (v == raw_club_c)
+    for v in fields:
+        valid = (v != '') & (v != 'NAN')
+        is_pos = valid & (v.isin(known_pos) | (v.str.contains(',', regex=False) & (v.str.len() < 15)))
+        true_club = true_club.mask(valid & ~is_pos, v)       # last club field wins...
+    true_pos = detailed_pos.fillna(true_pos)                 # ...but a detailed "DM, MC" list beats an acronym
+    true_club = raw_club_c.where(club_c_is_cand, true_club)  # and the club from Recent Callups is preferred
+
+    # Map to Core Unit for engine logic
+    fallback_unit = true_pos.map({p: map_pos_to_unit(p) for p in true_pos.unique()})
+    unit = np.select(
+        [true_pos.str.contains('GK', regex=False) | (raw_c_pos == 'GK'),
+         raw_c_pos.str.contains('DF', regex=False) | true_pos.str.contains('DEF', regex=False),
+         raw_c_pos.str.contains('FW', regex=False) | true_pos.str.contains('ATT', regex=False),
+         raw_c_pos.str.contains('MF', regex=False) | true_pos.str.contains('MID', regex=False)],
+        ['GK', 'DEF', 'ATT', 'MID'], default=fallback_unit.to_numpy(dtype=object)
+    )
+
+    # --- APPLY DYNAMIC FALLBACK RATING ---
+    fallback_rat = pool['team_slug'].map(team_medians).fillna(64.0) - 2.0
+    rat = pd.to_numeric(pool['rat'], errors='coerce').fillna(fallback_rat)
+
+    pool['display_name'] = merged_column('name', 'Unknown Player')
+    pool['display_pos'] = true_pos.where(true_pos != '', pd.Series(unit, index=pool.index))
+    pool['display_club'] = true_club.str.title()  # "West Ham" instead of "WEST HAM"
+    pool['unit'] = unit
+    pool['rat'] = rat
 
-    team_ratings = {}
-    
-    # 6. Squad Building per Team
-    for team_slug, group in pool.groupby('team_slug'):
-        fmt_data = TEAM_FORMATIONS.get(team_slug, {})
-        fmt_str = fmt_data.get('formation 1', '4-2-3-1') 
-        targets = parse_formation_to_targets(fmt_str)
-        squad_avg = group['rat'].mean() if not group.empty else 68
-
-        gks = group[group['unit'] == 'GK'].sort_values('selection_score', ascending=False)
-        outfield = group[group['unit'] != 'GK'].sort_values('selection_score', ascending=False)
-        defs = outfield[outfield['unit'] == 'DEF']
-        mids = outfield[outfield['unit'] == 'MID']
-        atts = outfield[outfield['unit'] == 'ATT']
-
-        selected_players = []
-
-        def pick_players(pool_df, count, role):
-            picks = pool_df.head(count).copy()
-            if not picks.empty:
-                picks['roster_status'] = role
-                selected_players.extend(picks.to_dict('records'))
-            return pool_df.iloc[count:]
+    # 5. Calculate SELECTION SCORE
+    caps = numeric_column('caps', 0.0)
+    age = numeric_column('age', 28.0)
+    squad_no = numeric_column('squad_no', 999.0)
+    status = merged_column('status', '').map(str)
+    captain = merged_column('captain', '').map(str).str.lower()
+    tier = pool['callup_tier'].astype(object).map(str).to_numpy() if 'callup_tier' in pool.columns else np.full(len(pool), 'None')
+    is_current = tier == 'Current'
+    status_lower = status.str.lower()
+
+    score = rat.to_numpy(dtype=float)
+    score = score + np.where(is_current, 5.0, np.where(tier == 'Recent', 2.0, 0.0))
+    score = score + np.where(is_current & (((unit == 'GK') & (squad_no == 1.0)) | (squad_no == 10.0)), 2.0, 0.0)
+
+    veteran = age >= 34.0
+    cap_bonus = np.where(veteran, np.minimum(caps * 0.10, 5.0), np.minimum(caps * 0.15, 8.0))
+    score = score - np.where(veteran, (age - 33.0) * 1.0, 0.0)
+    score = score + cap_bonus
+    score = score - np.where(status_lower.str.contains('INJ', regex=False), np.where(caps > 40.0, 3.0, 10.0), 0.0)
+    score = score + np.where(captain.str.contains('captain', regex=False), 8.0, 0.0)
+    score = np.where(status_lower.str.contains('RET', regex=False), -999.0, score)
+
+    pool['selection_score'] = score
+    pool['caps_out'] = caps
+    pool['age_out'] = age
+    pool['status_out'] = status
+    pool = pool[pool['selection_score'] > 0].reset_index(drop=True)
+
+    # 6. Squad Building
+    # Scores/units are plain arrays; each team only needs a few small argsorts. sort_desc reproduces
+    # pandas' sort_values(ascending=False) permutation exactly, so ties resolve as they always have.
+    UNITS = ['GK', 'DEF', 'MID', 'ATT']
+    formations = {t: TEAM_FORMATIONS.get(t, {}).get('formation 1', '4-2-3-1') for t in pool['team_slug'].unique()}
+    scores = pool['selection_score'].to_numpy()
+    unit_idx = pool['unit'].map({u: i for i, u in enumerate(UNITS)}).to_numpy()
+
+    def sort_desc(rows):
+        rev = rows[::-1]
+        return rev[scores[rev].argsort(kind='quicksort')][::-1]
+
+    roster_status = np.full(len(pool), '', dtype=object)
+    pick_seq = np.zeros(len(pool), dtype=np.int64)
+
+    team_codes, team_names = pd.factorize(pool['team_slug'], sort=True)
+    by_team = np.argsort(team_codes, kind='stable')
+    bounds = np.searchsorted(team_codes[by_team], np.arange(len(team_names) + 1))
+    for k, team_slug in enumerate(team_names):
+        rows = by_team[bounds[k]:bounds[k + 1]]
+        targets = parse_formation_to_targets(formations[team_slug])
+        gks = sort_desc(rows[unit_idx[rows] == 0])
+        outfield = sort_desc(rows[unit_idx[rows] != 0])
+        by_unit = {u: outfield[unit_idx[outfield] == i] for i, u in enumerate(UNITS) if i > 0}
+
+        picked = []
+        def pick(ordered, count, role):
+            roster_status[ordered[:count]] = role
+            picked.extend(ordered[:count].tolist())
+            return ordered[count:]
 
         # Starters
-        gks = pick_players(gks, targets['GK'], 'Starter')
-        defs = pick_players(defs, targets['DEF'], 'Starter')
-        mids = pick_players(mids, targets['MID'], 'Starter')
-        atts = pick_players(atts, targets['ATT'], 'Starter')
+        gks = pick(gks, targets['GK'], 'Starter')
+        for u in ['DEF', 'MID', 'ATT']:
+            by_unit[u] = pick(by_unit[u], targets[u], 'Starter')
 
         # Backups
-        gks = pick_players(gks, 2, 'Backup')
-        rem_outfield = pd.concat([defs, mids, atts]).sort_values('selection_score', ascending=False)
-        rem_outfield = pick_players(rem_outfield, 13, 'Backup')
+        gks = pick(gks, 2, 'Backup')
+        rem_outfield = sort_desc(np.concatenate([by_unit['DEF'], by_unit['MID'], by_unit['ATT']]))
+        rem_outfield = pick(rem_outfield, 13, 'Backup')
 
         # Fringe
-        pick_players(gks, 1, 'Fringe')
-        pick_players(rem_outfield, 5, 'Fringe')
-
-        final_squad = pd.DataFrame(selected_players)
-        if final_squad.empty: continue
+        pick(gks, 1, 'Fringe')
+        pick(rem_outfield, 5, 'Fringe')
+        pick_seq[picked] = np.arange(len(picked))
+
+    pool['roster_status'] = roster_status
+    pool['pick_seq'] = pick_seq
+    squads = pool[pool['roster_status'] != '']
+    squad_avgs = pool.groupby('team_slug')['rat'].mean().to_dict()
+    unit_means = squads.groupby(['team_slug', 'unit', 'roster_status'])['rat'].mean().to_dict()
+
+    # Roster listing: Starter, Fringe, Backup (descending status), best rating first
+    listing = squads.assign(status_rank=squads['roster_status'].map({'Starter': 0, 'Fringe': 1, 'Backup': 2}))
+    listing = listing.sort_values(['team_slug', 'status_rank', 'rat', 'pick_seq'],
+                                  ascending=[True, True, False, True], kind='stable')
+    players_by_team = {}
+    for t, name, pos, club, unit_, r, c, a, st, rs in zip(
+            *(listing[col].tolist() for col in ['team_slug', 'display_name', 'display_pos', 'display_club', 'unit',
+                                                 'rat', 'caps_out', 'age_out', 'status_out', 'roster_status'])):
+        players_by_team.setdefault(t, []).append({
+            'name': str(name), 'pos': str(pos), 'club': str(club), 'unit': str(unit_),
+            'rat': float(r), 'caps': int(c), 'age': int(a), 'status': str(st), 'roster_status': str(rs)
+        })
 
+    team_ratings = {}
+    for team_slug in sorted(players_by_team):
+        squad_avg = squad_avgs[team_slug]
         final_units = {}
-        for unit in ['GK', 'DEF', 'MID', 'ATT']:
-            unit_df = final_squad[final_squad['unit'] == unit]
-            s_rat = unit_df[unit_df['roster_status'] == 'Starter']['rat'].mean()
-            b_rat = unit_df[unit_df['roster_status'] == 'Backup']['rat'].mean()
-            f_rat = unit_df[unit_df['roster_status'] == 'Fringe']['rat'].mean()
+        for unit_ in UNITS:
+            s_rat = unit_means.get((team_slug, unit_, 'Starter'), np.nan)
+            b_rat = unit_means.get((team_slug, unit_, 'Backup'), np.nan)
+            f_rat = unit_means.get((team_slug, unit_, 'Fringe'), np.nan)
 
             if pd.isna(s_rat): s_rat = squad_avg
             if pd.isna(b_rat): b_rat = max(50, s_rat - 5)
             if pd.isna(f_rat): f_rat = max(50, b_rat - 3)
 
-            final_units[unit] = (s_rat * 0.75) + (b_rat * 0.20) + (f_rat * 0.05)
+            final_units[unit_] = (s_rat * 0.75) + (b_rat * 0.20) + (f_rat * 0.05)
 
         overall_talent = (final_units['GK']*0.1 + final_units['DEF']*0.3 + 
                           final_units['MID']*0.3 + final_units['ATT']*0.3)
-        
-        fixed_top_players = []
-        for _, row in final_squad.sort_values(by=['roster_status', 'rat'], ascending=[False, False]).iterrows():
-            
-            try: final_caps = int(float(get_merged_val(row, 'caps', 0)))
-            except: final_caps = 0
-                
-            try: final_age = int(float(get_merged_val(row, 'age', 28)))
-            except: final_age = 28
-            
-            fixed_top_players.append({
-                'name': str(row['display_name']),
-                'pos': str(row['display_pos']),
-                'club': str(row['display_club']),
-                'unit': str(row['unit']),
-                'rat': float(row['rat']),
-                'caps': final_caps,
-                'age': final_age,
-                'status': str(get_merged_val(row, 'status', '')),
-                'roster_status': str(row['roster_status'])
-            })
-        
+
         team_ratings[team_slug] = {
             'talent_score': overall_talent,
             'talent_weight': np.clip(overall_talent / 75.0, 0.85, 1.25),
@@ -582,8 +817,8 @@ def calculate_squad_ratings(player_df, formation_df, current_df, recent_df):
             'rating_def': final_units['DEF'],
             'rating_mid': final_units['MID'],
             'rating_att': final_units['ATT'],
-            'formation': fmt_str,
-            'top_players': fixed_top_players
+            'formation': formations[team_slug],
+            'top_players': players_by_team[team_slug]
         }
             
     return team_ratings
@@ -591,115 +826,586 @@ def calculate_squad_ratings(player_df, formation_df, current_df, recent_df):
 # =============================================================================
 # --- PART 2: INITIALIZATION (OPTIMIZED) ---
 # =============================================================================
+CONFED_TIERS = { 'UEFA': 1.0, 'CONMEBOL': 1.0, 'CAF': 0.9, 'AFC': 0.8, 'CONCACAF': 0.8, 'OFC': 0.7 }
+
+class TournamentClassifier:
+    """
+    Classifies every unique `tournament` value ONCE (K tier, importance,
+    finals flags) and hands out integer category codes, so the replay and
+    aggregate passes index small arrays instead of re-running substring scans.
+    """
+    FIELDS = ['base_k', 'region_scaled', 'non_fifa', 'importance', 'is_friendly', 'is_wc_finals', 'is_continental_finals']
+
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+        self.rows = []
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def code_of(self, tourney):
+        key = str(tourney)
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.names)
+            self.codes[key] = code
+            self.names.append(key)
+            self.rows.append(self._classify(key))
+            self._arrays = None
+        return code
+
+    def info(self, tourney):
+        return self.rows[self.code_of(tourney)]
+
+    def encode(self, tourneys):
+        """Integer category code for every entry of a column (each unique name classified once)"""
+        codes, uniques = pd.factorize(pd.Series(tourneys).astype(str))
+        lookup = np.array([self.code_of(t) for t in uniques], dtype=np.int32)
+        return lookup[codes]
+
+    def arrays(self):
+        """Per-category arrays, indexed by the codes from encode()"""
+        if self._arrays is None:
+            self._arrays = {f: np.array([row[f] for row in self.rows]) for f in self.FIELDS}
+        return self._arrays
+
+    @staticmethod
+    def _classify(t_str):
+        row = {'is_friendly': False}
+        t_low = t_str.lower()
+
+        # --- MATCH IMPORTANCE (lower-case matching) ---
+        # 1. World Cup Finals (The absolute gold standard of data)
+        if 'world cup' in t_low and 'qualification' not in t_low:
+            row['importance'] = 1.2
+        # 2. Continental Majors (Euros, Copa America)
+        elif any(x in t_low for x in ['copa américa', 'euro', 'african cup', 'asian cup', 'gold cup']) and 'qualification' not in t_low:
+            row['importance'] = 1.1
+        # 3. Qualifiers & Nations League (Highly competitive)
+        elif 'qualification' in t_low or 'nations league' in t_low:
+            row['importance'] = 1.0
+        # 4. Friendlies (Final value depends on the match date, see get_match_importance)
+        elif 'friendly' in t_low:
+            row['importance'] = 0.3
+            row['is_friendly'] = True
+        # 5. Minor Tournaments
+        else:
+            row['importance'] = 0.6
+
+        # --- PEDIGREE FLAGS ---
+        row['is_wc_finals'] = 'world cup' in t_low and 'qualification' not in t_low
+        row['is_continental_finals'] = any(x in t_low for x in ['copa américa', 'euro', 'african cup', 'asian cup', 'gold cup']) and 'qualification' not in t_low
+
+        # --- K FACTOR TIER (case-sensitive matching) ---
+        row['non_fifa'] = False
+        row['region_scaled'] = False
+
+        # =========================================================
+        # TIER -1: NON-FIFA / INDEPENDENT (The "Noise" Filter)
+        # =========================================================
+        # These tournaments are for non-FIFA members (e.g. Tibet, Kurdistan).
+        # We set K extremely low to prevent them from affecting global FIFA rankings.
+        if any(x in t_str for x in ['CONIFA', 'VIVA', 'Island Games', 'Wild Cup', 'ELF Cup', 'FIFI', 'Inter Games', 'Coupe de l\'Outre-Mer', 'Unity Cup']):
+            row['non_fifa'] = True
+            row['base_k'] = 5
+
+        # =========================================================
+        # TIER 0: FRIENDLIES & MINOR INVITATIONALS
+        # =========================================================
+        # Catch specific friendly tournament names from your list
+        elif any(x in t_str for x in ['Friendly', 'FIFA Series', 'Kirin', 'King\'s Cup', 'Merdeka', 'Nehru', 'China Cup', 'Bangabandhu', 'Four Nations', 'Mundialito', 'Lunar New Year', 'Tournoi de France']):
+            row['base_k'] = 15
+
+        # =========================================================
+        # TIER 1: WORLD CUP FINALS
+        # =========================================================
+        elif 'World Cup' in t_str and 'qualification' not in t_str:
+            row['base_k'] = 65
+        
+        # =========================================================
+        # TIER 2: CONTINENTAL MAJORS (FINALS)
+        # =========================================================
+        elif any(x in t_str for x in ['Copa América', 'UEFA Euro', 'African Cup of Nations', 'Asian Cup', 'Gold Cup', 'CONCACAF Championship', 'Oceania Nations Cup', 'CONMEBOL–UEFA Cup of Champions']) and 'qualification' not in t_str:
+            row['base_k'] = 50
+        # =========================================================
+        # TIER 3: QUALIFIERS & MAJOR OFFICIAL (Weighted by Region)
+        # =========================================================
+        elif any(x in t_str for x in ['qualification', 'Nations League', 'Confederations Cup', 'Arab Cup', 'Gulf Cup']):
+            # "qualification" catches: World Cup, Euro, Asian Cup, Gold Cup, etc.
+            # "Nations League" catches: UEFA NL, CONCACAF NL
+            row['base_k'] = 40
+            row['region_scaled'] = True
+        # =========================================================
+        # TIER 4: SUB-REGIONAL & OLYMPICS (Weighted by Region)
+        # =========================================================
+        # This tier is massive in your dataset. These are official but smaller than Continental Cups.
+        elif any(x in t_str for x in ['AFF', 'ASEAN', 'EAFF', 'CAFA', 'WAFF', 'SAFF', 'CECAFA', 'COSAFA', 'WAFU', 'CEMAC', 'UNCAF', 'CFU', 'Caribbean Cup', 'Baltic Cup', 'Nordic', 'British Home', 'Pacific Games', 'Melanesian', 'Polynesian', 'Olympic Games', 'Asian Games', 'Pan American']):
+            row['base_k'] = 25
+            row['region_scaled'] = True
+        # =========================================================
+        # DEFAULT CATCH-ALL
+        # =========================================================
+        else:
+            row['base_k'] = 20
+        return row
+
+TOURNAMENT_CLASSIFIER = TournamentClassifier()
+
 def get_match_importance(tourney, match_date):
-    t_str = str(tourney).lower()
-    
-    # 1. World Cup Finals (The absolute gold standard of data)
-    if 'world cup' in t_str and 'qualification' not in t_str:
-        return 1.2
-    # 2. Continental Majors (Euros, Copa America)
-    elif any(x in t_str for x in ['copa américa', 'euro', 'african cup', 'asian cup', 'gold cup']) and 'qualification' not in t_str:
-        return 1.1
-    # 3. Qualifiers & Nations League (Highly competitive)
-    elif 'qualification' in t_str or 'nations league' in t_str:
-        return 1.0
-    # 4. Friendlies
-    elif 'friendly' in t_str:
+    info = TOURNAMENT_CLASSIFIER.info(tourney)
+    if info['is_friendly']:
         # Pre-Tournament Friendlies (Usually played in May/June, or Nov for Qatar 2022)
         if match_date.month in [5, 6] or (match_date.year == 2022 and match_date.month == 11):
             return 0.7  # Teams play their starters, good data
         else:
             return 0.3  # Standard friendly, heavy rotation, mostly noise
-    # 5. Minor Tournaments
-    else:
-        return 0.6
+    return info['importance']
 
-def get_k_factor(tourney, goal_diff, home_team, away_team):
-    t_str = str(tourney)
+def get_region_weight(home_team, away_team):
      # --- CONFEDERATION LOOKUP
-    tier_map = { 'UEFA': 1.0, 'CONMEBOL': 1.0, 'CAF': 0.9, 'AFC': 0.8, 'CONCACAF': 0.8, 'OFC': 0.7 }
-    
     h_conf = TEAM_CONFEDS.get(home_team, 'OFC') 
     a_conf = TEAM_CONFEDS.get(away_team, 'OFC')
     
     if h_conf == a_conf:
-        region_weight = tier_map.get(h_conf, 0.75)
-    else:
-        region_weight = (tier_map.get(h_conf, 0.75) + tier_map.get(a_conf, 0.75)) / 2.0
-
-    # =========================================================
-    # TIER -1: NON-FIFA / INDEPENDENT (The "Noise" Filter)
-    # =========================================================
-    # These tournaments are for non-FIFA members (e.g. Tibet, Kurdistan).
-    # We set K extremely low to prevent them from affecting global FIFA rankings.
-    if any(x in t_str for x in ['CONIFA', 'VIVA', 'Island Games', 'Wild Cup', 'ELF Cup', 'FIFI', 'Inter Games', 'Coupe de l\'Outre-Mer', 'Unity Cup']):
-        return 5 
-
-    # =========================================================
-    # TIER 0: FRIENDLIES & MINOR INVITATIONALS
-    # =========================================================
-    # Catch specific friendly tournament names from your list
-    if any(x in t_str for x in ['Friendly', 'FIFA Series', 'Kirin', 'King\'s Cup', 'Merdeka', 'Nehru', 'China Cup', 'Bangabandhu', 'Four Nations', 'Mundialito', 'Lunar New Year', 'Tournoi de France']):
-        k = 15
-
-    # =========================================================
-    # TIER 1: WORLD CUP FINALS
-    # =========================================================
-    elif 'World Cup' in t_str and 'qualification' not in t_str:
-        k = 65
-    
-    # =========================================================
-    # TIER 2: CONTINENTAL MAJORS (FINALS)
-    # =========================================================
-    elif any(x in t_str for x in ['Copa América', 'UEFA Euro', 'African Cup of Nations', 'Asian Cup', 'Gold Cup', 'CONCACAF Championship', 'Oceania Nations Cup', 'CONMEBOL–UEFA Cup of Champions']) and 'qualification' not in t_str:
-        k = 50
-    # =========================================================
-    # TIER 3: QUALIFIERS & MAJOR OFFICIAL (Weighted by Region)
-    # =========================================================
-    elif any(x in t_str for x in ['qualification', 'Nations League', 'Confederations Cup', 'Arab Cup', 'Gulf Cup']):
-        # "qualification" catches: World Cup, Euro, Asian Cup, Gold Cup, etc.
-        # "Nations League" catches: UEFA NL, CONCACAF NL
-        k = 40 * region_weight
-    # =========================================================
-    # TIER 4: SUB-REGIONAL & OLYMPICS (Weighted by Region)
-    # =========================================================
-    # This tier is massive in your dataset. These are official but smaller than Continental Cups.
-    elif any(x in t_str for x in ['AFF', 'ASEAN', 'EAFF', 'CAFA', 'WAFF', 'SAFF', 'CECAFA', 'COSAFA', 'WAFU', 'CEMAC', 'UNCAF', 'CFU', 'Caribbean Cup', 'Baltic Cup', 'Nordic', 'British Home', 'Pacific Games', 'Melanesian', 'Polynesian', 'Olympic Games', 'Asian Games', 'Pan American']):
-        k = 25 * region_weight
-    # =========================================================
-    # DEFAULT CATCH-ALL
-    # =========================================================
-    else:
-        k = 20
+        return CONFED_TIERS.get(h_conf, 0.75)
+    return (CONFED_TIERS.get(h_conf, 0.75) + CONFED_TIERS.get(a_conf, 0.75)) / 2.0
 
+def get_goal_diff_factor(goal_diff):
     if goal_diff <= 1:
-        gd_factor = 1.0
+        return 1.0
     elif goal_diff == 2:
-        gd_factor = 1.5
+        return 1.5
+    return (11.0 + goal_diff) / 8.0
+
+def get_k_factor(tourney, goal_diff, home_team, away_team):
+    info = TOURNAMENT_CLASSIFIER.info(tourney)
+    if info['non_fifa']:
+        return 5
+
+    k = info['base_k']
+    if info['region_scaled']:
+        k = k * get_region_weight(home_team, away_team)
+    return k * get_goal_diff_factor(goal_diff)
+
+def match_k_factors(codes, goal_diff, home_teams, away_teams):
+    """Vectorized get_k_factor over tournament codes from TOURNAMENT_CLASSIFIER.encode()"""
+    table = TOURNAMENT_CLASSIFIER.arrays()
+    goal_diff = np.asarray(goal_diff)
+
+    conf_tier = {t: CONFED_TIERS.get(c, 0.75) for t, c in TEAM_CONFEDS.items()}
+    ofc_tier = CONFED_TIERS['OFC']
+    h_tier = np.array([conf_tier.get(t, ofc_tier) for t in home_teams])
+    a_tier = np.array([conf_tier.get(t, ofc_tier) for t in away_teams])
+    region_weight = (h_tier + a_tier) / 2.0
+
+    k = table['base_k'][codes].astype(float)
+    k = np.where(table['region_scaled'][codes], k * region_weight, k)
+    gd_factor = np.where(goal_diff <= 1, 1.0, np.where(goal_diff == 2, 1.5, (11.0 + goal_diff) / 8.0))
+    return np.where(table['non_fifa'][codes], 5.0, k * gd_factor)
+
+def match_importances(codes, dates):
+    """Vectorized get_match_importance over tournament codes and a datetime column"""
+    table = TOURNAMENT_CLASSIFIER.arrays()
+    dates = pd.DatetimeIndex(dates)
+    month, year = dates.month.values, dates.year.values
+    pre_tournament = np.isin(month, [5, 6]) | ((year == 2022) & (month == 11))
+    friendly_val = np.where(pre_tournament, 0.7, 0.3)
+    return np.where(table['is_friendly'][codes], friendly_val, table['importance'][codes])
+
+ELO_INITIAL_RATING = 1200.0
+ELO_EPOCH = pd.Timestamp('1970-01-01')
+
+def encode_elo_matches(df, hfa):
+    """Packs a date-sorted results frame (with a k_factor column) into typed arrays for replay_elo"""
+    index = pd.Index(TEAM_REGISTRY.slugs)
+    neutral = df['neutral'].to_numpy(dtype=bool)
+    return {
+        'home': index.get_indexer(df['home_team']).astype(np.int32),
+        'away': index.get_indexer(df['away_team']).astype(np.int32),
+        'day': (df['date'] - ELO_EPOCH).dt.days.to_numpy(dtype=np.int32),
+        'home_goals': df['home_score'].to_numpy(dtype=np.int8),
+        'away_goals': df['away_score'].to_numpy(dtype=np.int8),
+        'hfa': np.where(neutral, 0.0, float(hfa)),
+        'k': df['k_factor'].to_numpy(dtype=np.float64),
+    }
+
+def replay_elo(matches, ratings=None, checkpoints=None):
+    """
+    Replays Elo over encoded match arrays in one tight loop.
+    Returns per-match pre/post ratings, the home side's expectation and the final ratings array.
+    If `checkpoints` (sorted, unique match indices) is given, the ratings *before* each of those
+    matches are also returned as a (len(checkpoints), n_teams) array.
+    """
+    n = len(matches['home'])
+    if ratings is None: ratings = np.full(len(TEAM_REGISTRY), ELO_INITIAL_RATING)
+    r = ratings.tolist()
+    pre_h, pre_a, post_h, post_a, we_h = [0.0] * n, [0.0] * n, [0.0] * n, [0.0] * n, [0.0] * n
+    cps = checkpoints.tolist() if checkpoints is not None else []
+    snaps, next_cp = [], 0
+
+    columns = zip(matches['home'].tolist(), matches['away'].tolist(), matches['home_goals'].tolist(),
+                  matches['away_goals'].tolist(), matches['hfa'].tolist(), matches['k'].tolist())
+    for i, (h, a, hs, as_, hfa, k) in enumerate(columns):
+        if next_cp < len(cps) and cps[next_cp] == i:
+            snaps.append(r.copy()); next_cp += 1
+        rh = r[h]; ra = r[a]
+        we = 1 / (10**(-(rh - ra + hfa)/400) + 1)
+        W = 1.0 if hs > as_ else (0.5 if hs == as_ else 0.0)
+        change = k * (W - we)
+        r[h] = rh + change
+        r[a] = ra - change
+        pre_h[i] = rh; pre_a[i] = ra; we_h[i] = we
+        post_h[i] = r[h]; post_a[i] = r[a]
+
+    return {
+        'pre_home': np.array(pre_h), 'pre_away': np.array(pre_a),
+        'post_home': np.array(post_h), 'post_away': np.array(post_a),
+        'we_home': np.array(we_h), 'ratings': np.array(r),
+        'checkpoints': np.array(snaps).reshape(len(snaps), len(r))
+    }
+
+def slice_elo_matches(matches, start, stop):
+    return {key: arr[start:stop] for key, arr in matches.items()}
+
+def monthly_checkpoints(days):
+    """Index of the first match of every calendar month in a sorted day-number array"""
+    months = (days.astype('datetime64[D]').astype('datetime64[M]')).astype(np.int64)
+    return np.flatnonzero(np.diff(months, prepend=months[0] - 1)).astype(np.int32)
+
+def ratings_as_of(cutoff_date):
+    """
+    Ratings array (indexed by TEAM_REGISTRY id) from every match strictly before `cutoff_date`.
+    Starts from the nearest monthly checkpoint and replays only the matches after it.
+    """
+    if not ELO_CHECKPOINTS: return None
+    matches, index = ELO_CHECKPOINTS['matches'], ELO_CHECKPOINTS['index']
+    cutoff_day = (pd.to_datetime(cutoff_date) - ELO_EPOCH).days
+    stop = int(np.searchsorted(matches['day'], cutoff_day, side='left'))
+
+    j = int(np.searchsorted(index, stop, side='right')) - 1
+    if j < 0:
+        start, ratings = 0, np.full(len(TEAM_REGISTRY), ELO_INITIAL_RATING)
     else:
-        gd_factor = (11.0 + goal_diff) / 8.0
+        start, ratings = int(index[j]), ELO_CHECKPOINTS['ratings'][j]
+    if start == stop: return ratings.copy()
+    return replay_elo(slice_elo_matches(matches, start, stop), ratings)['ratings']
+
+def build_elo_history(matches, replay, dates):
+    """Splits the per-match post ratings into TEAM_HISTORY lists, keyed in order of first appearance"""
+    team_ids = np.column_stack([matches['home'], matches['away']]).ravel()
+    elo = np.column_stack([replay['post_home'], replay['post_away']]).ravel()
+    all_dates = pd.Series(np.repeat(np.asarray(dates, dtype='datetime64[ns]'), 2))
+
+    order = np.argsort(team_ids, kind='stable')
+    counts = np.bincount(team_ids, minlength=len(TEAM_REGISTRY))
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    elo_sorted = elo[order].tolist()
+    dates_sorted = all_dates.iloc[order].tolist()
+
+    _, first_seen = np.unique(team_ids, return_index=True)
+    history = {}
+    for tid in team_ids[np.sort(first_seen)].tolist():
+        lo, hi = bounds[tid], bounds[tid + 1]
+        history[TEAM_REGISTRY.slugs[tid]] = {'dates': dates_sorted[lo:hi], 'elo': elo_sorted[lo:hi]}
+    return history
+
+def tally_opponent_records(matches, replay):
+    """Counts W/D/L against elite/stronger/similar/weaker opponents (by pre-match Elo) -> (n_teams, 4, 3)"""
+    hg, ag = matches['home_goals'], matches['away_goals']
+    res_h = np.where(hg > ag, 0, np.where(hg == ag, 1, 2))
+    team = np.concatenate([matches['home'], matches['away']]).astype(np.int64)
+    own = np.concatenate([replay['pre_home'], replay['pre_away']])
+    opp = np.concatenate([replay['pre_away'], replay['pre_home']])
+    res = np.concatenate([res_h, 2 - res_h])
+
+    # 0 = elite, 1 = stronger, 2 = similar, 3 = weaker (same precedence as the old if/elif chain)
+    diff = opp - own
+    bucket = np.select([opp >= 1800, diff > 75, diff < -75], [0, 1, 3], default=2)
+    n = len(TEAM_REGISTRY)
+    return np.bincount(team * 12 + bucket * 3 + res, minlength=n * 12).reshape(n, 4, 3)
+
+def pedigree_values(is_wc_finals, is_continental_finals):
+    return np.where(is_wc_finals, 1.0, np.where(is_continental_finals, 0.35, 0.0))
+
+def _recent_rows(elo_df, matches, replay, ped_val, idx):
+    """Row tuples for _record_recent_matches from the replay arrays at positions `idx`"""
+    return zip(elo_df['home_team'].to_numpy()[idx].tolist(), elo_df['away_team'].to_numpy()[idx].tolist(),
+               matches['home_goals'][idx].tolist(), matches['away_goals'][idx].tolist(),
+               elo_df['date'].iloc[idx].tolist(), elo_df['importance'].to_numpy()[idx].tolist(),
+               ped_val[idx].tolist(), replay['pre_home'][idx].tolist(),
+               replay['pre_away'][idx].tolist(), replay['we_home'][idx].tolist())
+
+REGRESSION_DUMMY_GAMES = 6
+OPPONENT_TIER_KEYS = ['rec_elite', 'rec_stronger', 'rec_similar', 'rec_weaker']
+
+def new_team_stats():
+    """Blank TEAM_STATS entry for a team that has not been replayed yet"""
+    return {
+        'elo': ELO_INITIAL_RATING, 'notable_results': [],
+        'rec_weaker': [0, 0, 0], 'rec_similar': [0, 0, 0], 'rec_stronger': [0, 0, 0], 'rec_elite': [0, 0, 0],
+        'pedigree_pts': 0,
+        'upsets_major_won': 0,  'upsets_minor_won': 0, 'upsets_major_lost': 0, 'upsets_minor_lost': 0,
+        'matches': 0, 'clean_sheets': 0, 'btts': 0, 'gf_avg': 0, 'ga_avg': 0, 'off': 1.0, 'def': 1.0,
+        'penalties': 0, 'first_half': 0, 'late_goals': 0, 'total_goals_recorded': 0, 'form': []
+    }
+
+def _record_upset(team, opp, score_str, elo_diff, type_code, match_date):
+    TEAM_STATS[team]['notable_results'].append({
+        'opp': opp, 'score': score_str, 'diff': abs(int(elo_diff)), 'date': match_date, 'type': type_code
+    })
+
+def _record_recent_matches(rows, latest_date, recent_residuals):
+    """
+    Upsets, best wins, knockout experience and Elo residuals for matches in the recent window.
+    rows: (home, away, hs, as_, date, importance, pedigree_val, pre_elo_h, pre_elo_a, we_h)
+    """
+    for h, a, hs, as_, date, importance, ped, rh, ra, we_h in rows:
+        if ped > 0:
+            w = calculate_recency_weight(date, latest_date) 
+            TEAM_STATS[h]['ko_exp_weighted'] = TEAM_STATS[h].get('ko_exp_weighted', 0) + w
+            TEAM_STATS[a]['ko_exp_weighted'] = TEAM_STATS[a].get('ko_exp_weighted', 0) + w
+
+        if hs > as_:   res_h, res_a = 0, 2
+        elif hs == as_: res_h, res_a = 1, 1
+        else:          res_h, res_a = 2, 0
+        diff_h = ra - rh 
+        diff_a = rh - ra 
+
+        score_h = f"{hs}-{as_}"
+        if res_h == 0: 
+            if ra > TEAM_STATS[h].get('best_win_elo', 0):
+                TEAM_STATS[h]['best_win_elo'] = ra
+                TEAM_STATS[h]['best_win'] = f"{a.title()} ({score_h})"
+            if diff_h > 300:   
+                TEAM_STATS[h]['upsets_major_won'] += 1
+                _record_upset(h, a, score_h, diff_h, "WON_MAJOR", date)
+            elif diff_h > 150: 
+                TEAM_STATS[h]['upsets_minor_won'] += 1
+                _record_upset(h, a, score_h, diff_h, "WON_MINOR", date)
+        if res_h == 2: 
+            if diff_h < -300:   
+                TEAM_STATS[h]['upsets_major_lost'] += 1
+                _record_upset(h, a, score_h, diff_h, "LOST_MAJOR", date)
+            elif diff_h < -150: TEAM_STATS[h]['upsets_minor_lost'] += 1
+    
+        score_a = f"{as_}-{hs}"
+        if res_a == 0: 
+            if rh > TEAM_STATS[a].get('best_win_elo', 0):
+                TEAM_STATS[a]['best_win_elo'] = rh
+                TEAM_STATS[a]['best_win'] = f"{h.title()} ({score_a})"
+            if diff_a > 300:   
+                TEAM_STATS[a]['upsets_major_won'] += 1
+                _record_upset(a, h, score_a, diff_a, "WON_MAJOR", date)
+            elif diff_a > 150: 
+                TEAM_STATS[a]['upsets_minor_won'] += 1
+                _record_upset(a, h, score_a, diff_a, "WON_MINOR", date)
+
+        W_h = 1.0 if hs > as_ else (0.5 if hs == as_ else 0.0)
+        weight = calculate_recency_weight(date, latest_date) * importance
+        recent_residuals[h].append((weight, (W_h - we_h)**2))
+        recent_residuals[a].append((weight, ((1.0 - W_h) - (1.0 - we_h))**2))
+
+def recent_results_long(df, latest_date):
+    """
+    Two rows per match (team, opp, gf, ga, weight) in match order, home side first.
+    weight = recency weight x match importance, as used by the recent-form aggregates.
+    """
+    days_old = (latest_date - df['date']).dt.days.clip(lower=0).to_numpy()
+    weight = np.exp(-0.00035 * days_old) * df['importance'].to_numpy()
+    home, away = df['home_team'].to_numpy(), df['away_team'].to_numpy()
+    hs, as_ = df['home_score'].to_numpy(), df['away_score'].to_numpy()
+    return pd.DataFrame({
+        'team': np.column_stack([home, away]).ravel(),
+        'opp': np.column_stack([away, home]).ravel(),
+        'gf': np.column_stack([hs, as_]).ravel(),
+        'ga': np.column_stack([as_, hs]).ravel(),
+        'weight': np.repeat(weight, 2)
+    })
+
+def _accumulate_recent_results(long_df, aggregates, forms):
+    """
+    Adds recency-weighted goals/opponent-Elo aggregates, form, clean sheets and BTTS counts
+    from a recent_results_long frame. Opponent strength is read from TEAM_STATS['elo'].
+    """
+    long_df = long_df[long_df['team'].isin(list(TEAM_STATS))]
+    if long_df.empty: return
+    opp_elo = long_df['opp'].map({t: s['elo'] for t, s in TEAM_STATS.items()}).fillna(1200).to_numpy()
+    gf, ga, weight = long_df['gf'].to_numpy(), long_df['ga'].to_numpy(), long_df['weight'].to_numpy()
+    long_df = long_df.assign(
+        w_gf=gf * weight, w_ga=ga * weight, w_opp=opp_elo * weight,
+        clean_sheet=(ga == 0), btts=(gf > 0) & (ga > 0),
+        res=np.where(gf > ga, 'W', np.where(gf < ga, 'L', 'D'))
+    )
+
+    grouped = long_df.groupby('team', sort=False)
+    sums = grouped[['w_gf', 'w_ga', 'weight', 'w_opp', 'clean_sheet', 'btts']].sum()
+    sums['n'] = grouped.size()
+    new_forms = grouped['res'].agg(list)
+
+    for t, w_gf, w_ga, w, w_opp, cs, btts, n in sums.itertuples():
+        agg = aggregates[t]
+        agg['gf'] += w_gf
+        agg['ga'] += w_ga
+        agg['eff_games'] += w
+        agg['opp_elo_sum'] += w_opp
+        s = TEAM_STATS[t]
+        s['matches'] += int(n)
+        s['clean_sheets'] += int(cs)
+        s['btts'] += int(btts)
+        forms[t].extend(new_forms[t])
+
+def _accumulate_scorer_stats(scorers_df, latest_date):
+    """Recency-weighted goal, penalty, first-half and late-goal totals per team from goalscorers rows"""
+    scorers_df = scorers_df[scorers_df['team'].isin(list(TEAM_STATS))]
+    if scorers_df.empty: return
+    days_old = (latest_date - scorers_df['date']).dt.days.clip(lower=0).to_numpy()
+    weight = np.exp(-0.00035 * days_old)
+
+    # '90+2' -> 90; anything unparsable counts as a goal but not for the timing splits
+    if 'minute' in scorers_df.columns:
+        minute = pd.to_numeric(scorers_df['minute'].astype(str).str.split('+').str[0], errors='coerce').to_numpy()
+    else:
+        minute = np.full(len(scorers_df), np.nan)
+    if 'penalty' in scorers_df.columns:
+        penalty = scorers_df['penalty'].fillna(True).astype(bool).to_numpy()
+    else:
+        penalty = np.zeros(len(scorers_df), dtype=bool)
+
+    sums = pd.DataFrame({
+        'team': scorers_df['team'].to_numpy(), 'goals': weight, 'penalties': weight * penalty,
+        'first_half': weight * (minute <= 45), 'late_goals': weight * (minute >= 75)
+    }).groupby('team', sort=False).sum()
+
+    for t, goals, pens, fh, late in sums.itertuples():
+        s = TEAM_STATS[t]
+        s['total_goals_recorded'] += goals
+        s['penalties'] += pens
+        s['first_half'] += fh
+        s['late_goals'] += late
+
+def _finalize_team_stats(t, s, agg, form, residuals, avg_goals_global, global_elo_mean):
+    """Turns a team's raw recent aggregates into the off/def/volatility/momentum profile in TEAM_STATS"""
+    denom = agg['eff_games'] + REGRESSION_DUMMY_GAMES
+    numerator_gf = agg['gf'] + (REGRESSION_DUMMY_GAMES * avg_goals_global)
+    numerator_ga = agg['ga'] + (REGRESSION_DUMMY_GAMES * avg_goals_global)
+    
+    raw_gf_avg = numerator_gf / denom
+    raw_ga_avg = numerator_ga / denom
+    s['gf_avg'] = raw_gf_avg
+    s['ga_avg'] = raw_ga_avg 
+    
+    if agg['eff_games'] > 0: avg_opp_elo = agg['opp_elo_sum'] / agg['eff_games']
+    else: avg_opp_elo = global_elo_mean
         
-    return k * gd_factor
+    weighted_opp_elo = (avg_opp_elo * agg['eff_games'] + global_elo_mean * REGRESSION_DUMMY_GAMES) / denom
+    difficulty_ratio = weighted_opp_elo / global_elo_mean
+    
+    off_log = np.log(raw_gf_avg / avg_goals_global)
+    sos_weight_off = np.clip(difficulty_ratio, 0.85, 1.15)
+    adjusted_off = np.exp(off_log * sos_weight_off)
+
+    sos_weight_def = difficulty_ratio ** 1.1 
+    adjusted_def = (raw_ga_avg / avg_goals_global) / sos_weight_def
+
+    elo_ratio = s['elo'] / global_elo_mean
+    elo_off = elo_ratio ** 0.95 
+    elo_def = 1.0 / (elo_ratio ** 0.95) 
+    
+    elo_off = np.clip(elo_off, 0.6, 2.0)
+    elo_def = np.clip(elo_def, 0.6, 2.0)
+
+    elo_off_log = np.log(elo_off)
+    elo_def_log = np.log(elo_def)
+
+    STAT_WEIGHT = 0.35  
+    ELO_WEIGHT  = 0.65  
+
+    final_off_log = STAT_WEIGHT * np.log(adjusted_off) + ELO_WEIGHT * elo_off_log
+    s['off'] = np.exp(final_off_log)
+
+    final_def_log = STAT_WEIGHT * np.log(adjusted_def) + ELO_WEIGHT * elo_def_log
+    s['def'] = np.exp(final_def_log)
+    
+    s['off'] = np.clip(s['off'], 0.5, 2.2) 
+    s['def'] = np.clip(s['def'], 0.5, 2.2) 
+
+    s['adj_gf'] = s['off'] * avg_goals_global
+    s['adj_ga'] = s['def'] * avg_goals_global
+
+    recent_form = form[-5:] 
+    s['form'] = "".join(recent_form) if recent_form else "-----"
+    m = s['matches']
+    g = s['total_goals_recorded']
+    
+    s['cs_pct'] = (s['clean_sheets'] / m * 100) if m > 0 else 0
+    s['btts_pct'] = (s['btts'] / m * 100) if m > 0 else 0            
+    s['pen_pct'] = (s['penalties'] / g * 100) if g > 0 else 0
+    s['fh_pct'] = (s['first_half'] / g * 100) if g > 0 else 0
+    s['late_pct'] = (s['late_goals'] / g * 100) if g > 0 else 0
+    
+    if residuals:
+        num = sum(w * r for w, r in residuals)
+        den = sum(w for w, r in residuals)
+        s['volatility'] = np.clip(num / den, 0.05, 0.18)
+    else:
+        s['volatility'] = 0.15
+    
+    if t in TEAM_HISTORY and len(TEAM_HISTORY[t]['elo']) >= 10:
+        s['momentum'] = (TEAM_HISTORY[t]['elo'][-1] - TEAM_HISTORY[t]['elo'][-10]) / 100
+    else:
+        s['momentum'] = 0.0        
 
 def initialize_engine():
     try:
         return _initialize_engine_impl()
     except Exception as e:
-        js.console.error(f"Error in initialize_engine: {e}")
+        LOGGER.error(f"Error in initialize_engine: {e}")
         # Return safe defaults so the app can still start
         return {}, {}, 2.5, None
 
-def _initialize_engine_impl():
-    global TEAM_TALENT, TEAM_FORMATIONS, TEAM_HISTORY, TEAM_STATS, calculated_hfa, TEAM_CONFEDS
-    
-    # 1. SLUGIFY CONFEDERATIONS
-    # This guarantees that the keys perfectly match the match slugs later!
-    TEAM_CONFEDS = {get_slug(k): v for k, v in TEAM_CONFEDS.items()}
-    
-    results_df, scorers_df, df_names, player_df, formation_df, current_df, recent_df = load_data()
+def run_stages(stages, parallel=None):
+    """
+    Runs build stages {name: (input_names, fn)} in dependency order; fn receives its inputs' results.
+    With parallel=True every stage whose inputs are done runs concurrently on a thread pool.
+    Returns {name: result}.
+    """
+    parallel = INIT_PARALLEL if parallel is None else parallel
+    done, pending = {}, dict(stages)
+
+    def ready():
+        return [n for n, (deps, _) in pending.items() if all(d in done for d in deps)]
+
+    def unresolvable():
+        return ValueError(f"run_stages(): unresolvable inputs for {sorted(pending)}")
+
+    if not parallel:
+        while pending:
+            names = ready()
+            if not names: raise unresolvable()
+            for name in names:
+                deps, fn = pending.pop(name)
+                done[name] = fn(*[done[d] for d in deps])
+        return done
+
+    with ThreadPoolExecutor(max_workers=len(stages)) as pool:
+        running = {}
+        while pending or running:
+            for name in ready():
+                deps, fn = pending.pop(name)
+                running[pool.submit(fn, *[done[d] for d in deps])] = name
+            if not running: raise unresolvable()
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done[running.pop(future)] = future.result()
+    return done
+
+def _build_team_talent(data):
+    """Stage: formations + squad ratings (player and call-up files only, no results needed)"""
+    global TEAM_TALENT, TEAM_FORMATIONS
+    results_df, scorers_df, df_names, player_df, formation_df, current_df, recent_df = data
 
-    load_r32_combinations()
-    
     # 2. POPULATE FORMATIONS FIRST (Before calculating ratings!)
     TEAM_FORMATIONS = {}
     if formation_df is not None:
@@ -710,6 +1416,36 @@ def _initialize_engine_impl():
 
     # 3. THEN CALCULATE SQUAD RATINGS
     TEAM_TALENT = calculate_squad_ratings(player_df, formation_df, current_df, recent_df)
+    return TEAM_TALENT
+
+def _clean_results(results_df, name_map):
+    """Parsed dates, rows with a usable score, slugged team names (historical names mapped first), typed scores"""
+    results_df = results_df.copy()
+    results_df['date'] = pd.to_datetime(results_df['date'], errors='coerce')
+    results_df = results_df.dropna(subset=['date', 'home_score', 'away_score', 'neutral'])
+
+    # 1. Apply historical name changes (e.g. 'Soviet Union' -> 'Russia')
+    # 2. Convert to Slugs (e.g. 'Curaçao' -> 'curacao')
+    # This ensures that even if names differ slightly across files, they match here.
+    results_df['home_team'] = slug_column(results_df['home_team'], name_map=name_map)
+    results_df['away_team'] = slug_column(results_df['away_team'], name_map=name_map)
+
+    # 3. Ensure scores are integers
+    return results_df.astype({'home_score': int, 'away_score': int, 'neutral': bool})
+
+def _results_table():
+    """RESULTS_TABLE, re-read from results.csv after a warm start (snapshots don't carry it)"""
+    global RESULTS_TABLE
+    if RESULTS_TABLE is None:
+        results_df = load_dataset("results.csv")
+        if results_df is not None and 'date' in results_df.columns:
+            RESULTS_TABLE = _clean_results(results_df, ENGINE_STATE.get('name_map', {}))
+    return RESULTS_TABLE
+
+def _prepare_results(data):
+    """Stage: slugged results table, HFA, per-match K/importance and blank TEAM_STATS rows"""
+    global RESULTS_TABLE, calculated_hfa, TEAM_STATS, TEAM_HISTORY
+    results_df, scorers_df, df_names = data[:3]
 
     try:
         if df_names is not None and 'old_name' in df_names.columns and 'new_name' in df_names.columns:
@@ -719,26 +1455,14 @@ def _initialize_engine_impl():
     except:
         NAME_MAP = {}
 
-    if results_df is None: return {}, {}, 2.5, None
+    if results_df is None: return None
 
     # CRASH PROTECTION
     if 'date' not in results_df.columns:
         raise ValueError(f"CRITICAL: 'date' column missing in results.csv. Check if your URL returns a 404 HTML page instead of CSV. Columns found: {list(results_df.columns)}")
 
-    results_df['date'] = pd.to_datetime(results_df['date'], errors='coerce')
-    results_df = results_df.dropna(subset=['date', 'home_score', 'away_score', 'neutral'])
-    
-    # 1. Apply historical name changes (e.g. 'Soviet Union' -> 'Russia')
-    results_df['home_team'] = results_df['home_team'].replace(NAME_MAP)
-    results_df['away_team'] = results_df['away_team'].replace(NAME_MAP)
-
-    # 2. Convert to Slugs (e.g. 'Curaçao' -> 'curacao')
-    # This ensures that even if names differ slightly across files, they match here.
-    results_df['home_team'] = results_df['home_team'].apply(get_slug)
-    results_df['away_team'] = results_df['away_team'].apply(get_slug)
-
-    # 3. Ensure scores are integers
-    results_df = results_df.astype({'home_score': int, 'away_score': int})
+    results_df = _clean_results(results_df, NAME_MAP)
+    RESULTS_TABLE = results_df
 
     # HFA CALC
     non_neutral = results_df[results_df['neutral'] == False]
@@ -748,297 +1472,159 @@ def _initialize_engine_impl():
     if total_non_neutral > 0:
         h_win_prob = h_wins / total_non_neutral
         h_win_prob = max(0.01, min(0.99, h_win_prob))
-        global calculated_hfa
         calculated_hfa = round(-400 * math.log10(1/h_win_prob - 1))
     else:
         calculated_hfa = 100 
     
-    js.console.log(f"Data-Driven HFA: {calculated_hfa}")
-    elo_df = results_df.sort_values('date')
+    LOGGER.log(f"Data-Driven HFA: {calculated_hfa}")
+    elo_df = results_df.sort_values('date', kind='stable')
+
+    # Classify each unique tournament name once, then work with integer codes
+    t_codes = TOURNAMENT_CLASSIFIER.encode(elo_df['tournament'])
+    t_table = TOURNAMENT_CLASSIFIER.arrays()
+    elo_df = elo_df.assign(
+        k_factor=match_k_factors(t_codes, (elo_df['home_score'] - elo_df['away_score']).abs().values, elo_df['home_team'], elo_df['away_team']),
+        importance=match_importances(t_codes, elo_df['date']),
+        is_wc_finals=t_table['is_wc_finals'][t_codes],
+        is_continental_finals=t_table['is_continental_finals'][t_codes]
+    )
 
-    team_elo = {}
-    INITIAL_RATING = 1200
     RELEVANCE_CUTOFF = pd.to_datetime('2021-01-01') 
-    
-    global TEAM_HISTORY, TEAM_STATS
     TEAM_HISTORY = {} 
     TEAM_STATS = {}
-    
-    LATEST_DATE = elo_df['date'].max()
     all_teams_set = set(elo_df['home_team']).union(set(elo_df['away_team']))
-    recent_residuals = {t: [] for t in all_teams_set}
-    
     for t in all_teams_set:
-        TEAM_STATS[t] = {
-            'elo': INITIAL_RATING, 'notable_results': [],
-            'rec_weaker': [0, 0, 0], 'rec_similar': [0, 0, 0], 'rec_stronger': [0, 0, 0], 'rec_elite': [0, 0, 0],
-            'pedigree_pts': 0,
-            'upsets_major_won': 0,  'upsets_minor_won': 0, 'upsets_major_lost': 0, 'upsets_minor_lost': 0,
-            'matches': 0, 'clean_sheets': 0, 'btts': 0, 'gf_avg': 0, 'ga_avg': 0, 'off': 1.0, 'def': 1.0,
-            'penalties': 0, 'first_half': 0, 'late_goals': 0, 'total_goals_recorded': 0, 'form': []
-        }
+        TEAM_STATS[t] = new_team_stats()
 
-    matches_data = zip(elo_df['home_team'], elo_df['away_team'], elo_df['home_score'], elo_df['away_score'], elo_df['tournament'], elo_df['neutral'], elo_df['date'])
+    recent_df = elo_df[elo_df['date'] > RELEVANCE_CUTOFF]
+    if len(recent_df) > 0:
+        latest_date = recent_df['date'].max()
+        avg_goals_global = (recent_df['home_score'].mean() + recent_df['away_score'].mean()) / 2
+    else:
+        latest_date = pd.to_datetime('today')
+        avg_goals_global = 1.25
 
-    for h, a, hs, as_, tourney, neutral, date in matches_data:
-        rh = team_elo.get(h, INITIAL_RATING)
-        ra = team_elo.get(a, INITIAL_RATING)
+    return {
+        'results_df': results_df, 'elo_df': elo_df, 'recent_df': recent_df, 'name_map': NAME_MAP,
+        'teams': all_teams_set, 'relevance_cutoff': RELEVANCE_CUTOFF,
+        'latest_date': latest_date, 'avg_goals_global': avg_goals_global
+    }
 
-        if hs > as_:   res_h, res_a = 0, 2
-        elif hs == as_: res_h, res_a = 1, 1
-        else:          res_h, res_a = 2, 0
-        
-        t_str = str(tourney).lower()
-        is_wc_finals = 'world cup' in t_str and 'qualification' not in t_str
-        is_continental_finals = any(x in t_str for x in ['copa américa', 'euro', 'african cup', 'asian cup', 'gold cup']) and 'qualification' not in t_str
+def _replay_results(prep):
+    """Stage: Elo replay, history, opponent records, pedigree and recent-window bookkeeping"""
+    global TEAM_REGISTRY, ELO_CHECKPOINTS, TEAM_HISTORY
+    if prep is None: return None
+    elo_df, all_teams_set = prep['elo_df'], prep['teams']
 
-        if is_wc_finals or is_continental_finals:
-            ped_val = 1.0 if is_wc_finals else 0.35
-            TEAM_STATS[h]['pedigree_pts'] = TEAM_STATS[h].get('pedigree_pts', 0) + ped_val
-            TEAM_STATS[a]['pedigree_pts'] = TEAM_STATS[a].get('pedigree_pts', 0) + ped_val
+    # Dense integer ids for every results team, interned once (sorted so ids are stable between runs).
+    # Teams only known from the squad files are appended after the talent stage joins.
+    TEAM_REGISTRY = TeamRegistry(sorted(all_teams_set))
+    recent_residuals = {t: [] for t in all_teams_set}
 
-        diff_h = ra - rh 
-        if ra >= 1800: TEAM_STATS[h]['rec_elite'][res_h] += 1
-        elif diff_h > 75: TEAM_STATS[h]['rec_stronger'][res_h] += 1
-        elif diff_h < -75: TEAM_STATS[h]['rec_weaker'][res_h] += 1
-        else: TEAM_STATS[h]['rec_similar'][res_h] += 1
+    # 4. REPLAY ELO OVER TYPED ARRAYS
+    matches = encode_elo_matches(elo_df, calculated_hfa)
+    checkpoint_index = monthly_checkpoints(matches['day'])
+    replay = replay_elo(matches, checkpoints=checkpoint_index)
+    ELO_CHECKPOINTS = {'matches': matches, 'index': checkpoint_index, 'ratings': replay['checkpoints']}
+    TEAM_HISTORY = build_elo_history(matches, replay, elo_df['date'])
 
-        diff_a = rh - ra 
-        if rh >= 1800: TEAM_STATS[a]['rec_elite'][res_a] += 1
-        elif diff_a > 75: TEAM_STATS[a]['rec_stronger'][res_a] += 1
-        elif diff_a < -75: TEAM_STATS[a]['rec_weaker'][res_a] += 1
-        else: TEAM_STATS[a]['rec_similar'][res_a] += 1
-
-        if date > RELEVANCE_CUTOFF:
-            if is_wc_finals or is_continental_finals:
-                w = calculate_recency_weight(date, LATEST_DATE) 
-                TEAM_STATS[h]['ko_exp_weighted'] = TEAM_STATS[h].get('ko_exp_weighted', 0) + w
-                TEAM_STATS[a]['ko_exp_weighted'] = TEAM_STATS[a].get('ko_exp_weighted', 0) + w
-
-            def record_upset(team, opp, score_str, elo_diff, type_code, match_date):
-                TEAM_STATS[team]['notable_results'].append({
-                    'opp': opp, 'score': score_str, 'diff': abs(int(elo_diff)), 'date': match_date, 'type': type_code
-                })
-            
-            score_h = f"{hs}-{as_}"
-            if res_h == 0: 
-                # ---- NEW: Track Best Win (Home) ----
-                if ra > TEAM_STATS[h].get('best_win_elo', 0):
-                    TEAM_STATS[h]['best_win_elo'] = ra
-                    TEAM_STATS[h]['best_win'] = f"{a.title()} ({score_h})"
-                # ------------------------------------
-                if diff_h > 300:   
-                    TEAM_STATS[h]['upsets_major_won'] += 1
-                    record_upset(h, a, score_h, diff_h, "WON_MAJOR", date)
-                elif diff_h > 150: 
-                    TEAM_STATS[h]['upsets_minor_won'] += 1
-                    record_upset(h, a, score_h, diff_h, "WON_MINOR", date)
-            if res_h == 2: 
-                if diff_h < -300:   
-                    TEAM_STATS[h]['upsets_major_lost'] += 1
-                    record_upset(h, a, score_h, diff_h, "LOST_MAJOR", date)
-                elif diff_h < -150: TEAM_STATS[h]['upsets_minor_lost'] += 1
-            
-            score_a = f"{as_}-{hs}"
-            if res_a == 0: 
-                # ---- NEW: Track Best Win (Away) ----
-                if rh > TEAM_STATS[a].get('best_win_elo', 0):
-                    TEAM_STATS[a]['best_win_elo'] = rh
-                    TEAM_STATS[a]['best_win'] = f"{h.title()} ({score_a})"
-                # ------------------------------------
-                if diff_a > 300:   
-                    TEAM_STATS[a]['upsets_major_won'] += 1
-                    record_upset(a, h, score_a, diff_a, "WON_MAJOR", date)
-                elif diff_a > 150: 
-                    TEAM_STATS[a]['upsets_minor_won'] += 1
-                    record_upset(a, h, score_a, diff_a, "WON_MINOR", date)
-        
-        if h not in TEAM_HISTORY: TEAM_HISTORY[h] = {'dates': [], 'elo': []}
-        if a not in TEAM_HISTORY: TEAM_HISTORY[a] = {'dates': [], 'elo': []}
-        
-        dr = rh - ra + (calculated_hfa if not neutral else 0)
-        we_h = 1 / (10**(-dr/400) + 1)
-        W_h = 1.0 if hs > as_ else (0.5 if hs == as_ else 0.0)
-        
-        k = get_k_factor(tourney, abs(hs - as_), h, a)
-        change = k * (W_h - we_h)
-
-        if date > RELEVANCE_CUTOFF:
-            weight = calculate_recency_weight(date, LATEST_DATE) * get_match_importance(tourney, date)
-            res_h_vol = (W_h - we_h)**2
-            recent_residuals[h].append((weight, res_h_vol))
-            res_a_vol = ((1.0 - W_h) - (1.0 - we_h))**2
-            recent_residuals[a].append((weight, res_a_vol))
-        
-        team_elo[h] = rh + change
-        team_elo[a] = ra - change
-        
-        TEAM_HISTORY[h]['dates'].append(date); TEAM_HISTORY[h]['elo'].append(team_elo[h])
-        TEAM_HISTORY[a]['dates'].append(date); TEAM_HISTORY[a]['elo'].append(team_elo[a])
+    # Whole-history bookkeeping from the pre-match ratings
+    records = tally_opponent_records(matches, replay)
+    ped_val = pedigree_values(elo_df['is_wc_finals'].to_numpy(), elo_df['is_continental_finals'].to_numpy())
+    side_ids = np.column_stack([matches['home'], matches['away']]).ravel()
+    pedigree = np.bincount(side_ids, weights=np.repeat(ped_val, 2), minlength=len(TEAM_REGISTRY))
 
     for t in all_teams_set:
-        TEAM_STATS[t]['elo'] = team_elo.get(t, INITIAL_RATING)
+        tid = TEAM_REGISTRY.ids[t]
+        s = TEAM_STATS[t]
+        s['elo'] = float(replay['ratings'][tid])
+        s['pedigree_pts'] = float(pedigree[tid])
+        for bucket, key in enumerate(OPPONENT_TIER_KEYS):
+            s[key] = records[tid, bucket].tolist()
+
+    # Recent-window bookkeeping (upsets, best wins, residuals) only touches the last few years
+    recent_idx = np.flatnonzero((elo_df['date'] > prep['relevance_cutoff']).to_numpy())
+    _record_recent_matches(_recent_rows(elo_df, matches, replay, ped_val, recent_idx), elo_df['date'].max(), recent_residuals)
 
-    recent_df = elo_df[elo_df['date'] > RELEVANCE_CUTOFF]
-    if len(recent_df) > 0:
-        LATEST_DATE = recent_df['date'].max()
-        avg_goals_global = (recent_df['home_score'].mean() + recent_df['away_score'].mean()) / 2
-    else:
-        LATEST_DATE = pd.to_datetime('today')
-        avg_goals_global = 1.25
-    
     team_recent_aggregates = {t: {'gf':0, 'ga':0, 'eff_games':0, 'opp_elo_sum':0} for t in all_teams_set}
-    
-    for _, row in recent_df.iterrows():
-        h, a = row['home_team'], row['away_team']
-        hs, as_ = row['home_score'], row['away_score']
-        match_date = row['date']
-        
-        h_elo = TEAM_STATS.get(h, {}).get('elo', 1200)
-        a_elo = TEAM_STATS.get(a, {}).get('elo', 1200)
+    forms = {t: [] for t in all_teams_set}
+    _accumulate_recent_results(recent_results_long(prep['recent_df'], prep['latest_date']), team_recent_aggregates, forms)
 
-        weight = calculate_recency_weight(match_date, LATEST_DATE) * get_match_importance(row['tournament'], match_date)
-
-        if h in TEAM_STATS:
-            TEAM_STATS[h]['matches'] += 1
-            res = 'W' if hs > as_ else ('L' if hs < as_ else 'D')
-            TEAM_STATS[h]['form'].append(res)
-            
-            agg = team_recent_aggregates[h]
-            agg['gf'] += (hs * weight)
-            agg['ga'] += (as_ * weight)
-            agg['eff_games'] += weight       
-            agg['opp_elo_sum'] += (a_elo * weight)
-            
-            if as_ == 0: TEAM_STATS[h]['clean_sheets'] += 1
-            if hs > 0 and as_ > 0: TEAM_STATS[h]['btts'] += 1
-
-        if a in TEAM_STATS: 
-            TEAM_STATS[a]['matches'] += 1
-            res = 'W' if as_ > hs else ('L' if as_ < hs else 'D')
-            TEAM_STATS[a]['form'].append(res)
-
-            agg = team_recent_aggregates[a]
-            agg['gf'] += (as_ * weight)
-            agg['ga'] += (hs * weight)
-            agg['eff_games'] += weight
-            agg['opp_elo_sum'] += (h_elo * weight)
-            
-            if hs == 0: TEAM_STATS[a]['clean_sheets'] += 1
-            if hs > 0 and as_ > 0: TEAM_STATS[a]['btts'] += 1
+    return {'ratings': replay['ratings'], 'aggregates': team_recent_aggregates, 'forms': forms, 'residuals': recent_residuals}
 
+def _aggregate_scorers(data, prep):
+    """Stage: penalty / first-half / late-goal shares (needs only the slugged teams and the latest date)"""
+    scorers_df = data[1]
+    if prep is None: return
     if scorers_df is not None and 'team' in scorers_df.columns and 'date' in scorers_df.columns:
-        # Replaced the .str.lower().str.strip() with a full apply(get_slug)
-        scorers_df['team'] = scorers_df['team'].replace(NAME_MAP).apply(get_slug)
+        # Replaced the .str.lower().str.strip() with full get_slug slugging
+        scorers_df['team'] = slug_column(scorers_df['team'], name_map=prep['name_map'])
         scorers_df['date'] = pd.to_datetime(scorers_df['date'], errors='coerce')
-        modern_scorers = scorers_df[scorers_df['date'] > RELEVANCE_CUTOFF]
-        
-        for _, row in modern_scorers.iterrows():
-            t = row['team']
-            if t in TEAM_STATS:
-                weight = calculate_recency_weight(row['date'], LATEST_DATE)
-                TEAM_STATS[t]['total_goals_recorded'] += weight
-                if 'penalty' in row and row['penalty']: TEAM_STATS[t]['penalties'] += weight
-                try:
-                    if 'minute' in row and pd.notnull(row['minute']):
-                        minute = float(str(row['minute']).split('+')[0])
-                        if minute <= 45: TEAM_STATS[t]['first_half'] += weight
-                        if minute >= 75: TEAM_STATS[t]['late_goals'] += weight
-                except: pass
+        modern_scorers = scorers_df[scorers_df['date'] > prep['relevance_cutoff']]
+        _accumulate_scorer_stats(modern_scorers, prep['latest_date'])
+
+def _initialize_engine_impl():
+    global TEAM_CONFEDS, TEAM_PROFILES, ENGINE_STATE
+    
+    # 1. SLUGIFY CONFEDERATIONS
+    # This guarantees that the keys perfectly match the match slugs later!
+    TEAM_CONFEDS = {get_slug(k): v for k, v in TEAM_CONFEDS.items()}
+
+    # Talent (squad files) and the results pipeline are independent until the final join;
+    # the scorer aggregation runs alongside the Elo replay.
+    built = run_stages({
+        'data': ((), load_data),
+        'r32': ((), load_r32_combinations),
+        'talent': (('data',), _build_team_talent),
+        'results': (('data',), _prepare_results),
+        'elo': (('results',), _replay_results),
+        'scorers': (('data', 'results'), _aggregate_scorers),
+    })
+    prep, elo = built['results'], built['elo']
+    if prep is None: return {}, {}, 2.5, None
+
+    # Squad-only teams get ids after every results team; their ratings start at the initial value
+    for t in sorted(set(TEAM_TALENT) - prep['teams']):
+        TEAM_REGISTRY.intern(t)
+    width = len(TEAM_REGISTRY)
+    ratings = np.concatenate([elo['ratings'], np.full(width - len(elo['ratings']), ELO_INITIAL_RATING)])
+    old_cp = ELO_CHECKPOINTS['ratings']
+    ELO_CHECKPOINTS['ratings'] = np.hstack([old_cp, np.full((old_cp.shape[0], width - old_cp.shape[1]), ELO_INITIAL_RATING)])
 
     active_elos = [s['elo'] for s in TEAM_STATS.values()]
     GLOBAL_ELO_MEAN = sum(active_elos) / len(active_elos) if active_elos else 1500
 
-    global TEAM_PROFILES
     TEAM_PROFILES = {}
-    REGRESSION_DUMMY_GAMES = 6
     
     for t, s in TEAM_STATS.items():
-        agg = team_recent_aggregates[t]
-        
-        denom = agg['eff_games'] + REGRESSION_DUMMY_GAMES
-        numerator_gf = agg['gf'] + (REGRESSION_DUMMY_GAMES * avg_goals_global)
-        numerator_ga = agg['ga'] + (REGRESSION_DUMMY_GAMES * avg_goals_global)
-        
-        raw_gf_avg = numerator_gf / denom
-        raw_ga_avg = numerator_ga / denom
-        s['gf_avg'] = raw_gf_avg
-        s['ga_avg'] = raw_ga_avg 
-        
-        if agg['eff_games'] > 0: avg_opp_elo = agg['opp_elo_sum'] / agg['eff_games']
-        else: avg_opp_elo = GLOBAL_ELO_MEAN
-            
-        weighted_opp_elo = (avg_opp_elo * agg['eff_games'] + GLOBAL_ELO_MEAN * REGRESSION_DUMMY_GAMES) / denom
-        difficulty_ratio = weighted_opp_elo / GLOBAL_ELO_MEAN
-        
-        off_log = np.log(raw_gf_avg / avg_goals_global)
-        sos_weight_off = np.clip(difficulty_ratio, 0.85, 1.15)
-        adjusted_off = np.exp(off_log * sos_weight_off)
-
-        sos_weight_def = difficulty_ratio ** 1.1 
-        adjusted_def = (raw_ga_avg / avg_goals_global) / sos_weight_def
-
-        elo_ratio = s['elo'] / GLOBAL_ELO_MEAN
-        elo_off = elo_ratio ** 0.95 
-        elo_def = 1.0 / (elo_ratio ** 0.95) 
-        
-        elo_off = np.clip(elo_off, 0.6, 2.0)
-        elo_def = np.clip(elo_def, 0.6, 2.0)
-
-        elo_off_log = np.log(elo_off)
-        elo_def_log = np.log(elo_def)
-
-        STAT_WEIGHT = 0.35  
-        ELO_WEIGHT  = 0.65  
-
-        final_off_log = STAT_WEIGHT * np.log(adjusted_off) + ELO_WEIGHT * elo_off_log
-        s['off'] = np.exp(final_off_log)
-
-        final_def_log = STAT_WEIGHT * np.log(adjusted_def) + ELO_WEIGHT * elo_def_log
-        s['def'] = np.exp(final_def_log)
-        
-        s['off'] = np.clip(s['off'], 0.5, 2.2) 
-        s['def'] = np.clip(s['def'], 0.5, 2.2) 
-
-        s['adj_gf'] = s['off'] * avg_goals_global
-        s['adj_ga'] = s['def'] * avg_goals_global
-
-        recent_form = s['form'][-5:] 
-        s['form'] = "".join(recent_form) if recent_form else "-----"
-        m = s['matches']
-        g = s['total_goals_recorded']
-        
-        s['cs_pct'] = (s['clean_sheets'] / m * 100) if m > 0 else 0
-        s['btts_pct'] = (s['btts'] / m * 100) if m > 0 else 0            
-        s['pen_pct'] = (s['penalties'] / g * 100) if g > 0 else 0
-        s['fh_pct'] = (s['first_half'] / g * 100) if g > 0 else 0
-        s['late_pct'] = (s['late_goals'] / g * 100) if g > 0 else 0
-        
-        if t in recent_residuals and recent_residuals[t]:
-            num = sum(w * r for w, r in recent_residuals[t])
-            den = sum(w for w, r in recent_residuals[t])
-            s['volatility'] = np.clip(num / den, 0.05, 0.18)
-        else:
-            s['volatility'] = 0.15
-        
-        if t in TEAM_HISTORY and len(TEAM_HISTORY[t]['elo']) >= 10:
-            s['momentum'] = (TEAM_HISTORY[t]['elo'][-1] - TEAM_HISTORY[t]['elo'][-10]) / 100
-        else:
-            s['momentum'] = 0.0        
+        _finalize_team_stats(t, s, elo['aggregates'][t], elo['forms'][t], elo['residuals'].get(t), prep['avg_goals_global'], GLOBAL_ELO_MEAN)
+
+    # 5. PERSIST REPLAY STATE FOR INCREMENTAL INGESTION
+    ENGINE_STATE = {
+        'ratings': ratings, 'last_date': prep['elo_df']['date'].max(), 'latest_date': prep['latest_date'],
+        'relevance_cutoff': prep['relevance_cutoff'], 'name_map': prep['name_map'],
+        'avg_goals_global': prep['avg_goals_global'], 'global_elo_mean': GLOBAL_ELO_MEAN,
+        'aggregates': elo['aggregates'], 'forms': elo['forms'], 'residuals': elo['residuals']
+    }
 
-    return TEAM_STATS, TEAM_PROFILES, AVG_GOALS, results_df
+    return TEAM_STATS, TEAM_PROFILES, AVG_GOALS, prep['results_df']
 
 # =============================================================================
 # --- PART 3: SIMULATION ---
 # =============================================================================
 def calculate_confed_strength(results_df=None):
+    """
+    Inter-confederation points rate since 2014 -> CONFED_MULTIPLIERS.
+    Without an explicit frame it reuses RESULTS_TABLE from the last engine build,
+    and only falls back to the cached results.csv frame if the engine was never built.
+    """
     global CONFED_MULTIPLIERS
     
     if results_df is None:
-        results_df = load_data()[0] 
-        if results_df is not None and 'date' in results_df.columns:
-            results_df['date'] = pd.to_datetime(results_df['date'], errors='coerce')
-            
+        results_df = RESULTS_TABLE
+    if results_df is None:
+        results_df = load_dataset("results.csv")
+
     if results_df is None or 'date' not in results_df.columns:
         for confed in set(TEAM_CONFEDS.values()):
             CONFED_MULTIPLIERS[confed] = 0.85
@@ -1046,38 +1632,39 @@ def calculate_confed_strength(results_df=None):
 
     recent_cutoff = pd.to_datetime('2014-01-01')
     modern_df = results_df[results_df['date'] > recent_cutoff]
-    
-    confed_performance = {c: {'pts': 0, 'matches': 0} for c in set(TEAM_CONFEDS.values())}
-    
-    for _, row in modern_df.iterrows():
-        h_conf = TEAM_CONFEDS.get(row['home_team'].lower(), 'OFC')
-        a_conf = TEAM_CONFEDS.get(row['away_team'].lower(), 'OFC')
-        
-        if h_conf != a_conf:
-            confed_performance[h_conf]['matches'] += 1
-            confed_performance[a_conf]['matches'] += 1
-            if row['home_score'] > row['away_score']:
-                confed_performance[h_conf]['pts'] += 1
-            elif row['away_score'] > row['home_score']:
-                confed_performance[a_conf]['pts'] += 1
-            else:
-                confed_performance[h_conf]['pts'] += 0.5
-                confed_performance[a_conf]['pts'] += 0.5
 
-    for confed, data in confed_performance.items():
-        if data['matches'] > 0:
-            win_rate = data['pts'] / data['matches']
+    h_conf = modern_df['home_team'].str.lower().map(TEAM_CONFEDS).fillna('OFC').to_numpy()
+    a_conf = modern_df['away_team'].str.lower().map(TEAM_CONFEDS).fillna('OFC').to_numpy()
+    hs, as_ = modern_df['home_score'].to_numpy(), modern_df['away_score'].to_numpy()
+    inter = h_conf != a_conf
+
+    # Win = 1, draw = 0.5 for each side of every inter-confederation match
+    pts_h = np.where(hs > as_, 1.0, np.where(hs < as_, 0.0, 0.5))[inter]
+    per_confed = pd.DataFrame({
+        'confed': np.concatenate([h_conf[inter], a_conf[inter]]),
+        'pts': np.concatenate([pts_h, 1.0 - pts_h])
+    }).groupby('confed')['pts'].agg(['sum', 'count'])
+
+    for confed in set(TEAM_CONFEDS.values()):
+        if confed in per_confed.index and per_confed.at[confed, 'count'] > 0:
+            win_rate = float(per_confed.at[confed, 'sum'] / per_confed.at[confed, 'count'])
             CONFED_MULTIPLIERS[confed] = round(0.8 + (win_rate * 0.4), 3)
         else:
             CONFED_MULTIPLIERS[confed] = 0.85 
 
-def engineer_team_signatures(results_df):
+def engineer_team_signatures(results_df, teams=None):
+    """
+    Style profile, pace_factor and engineered_xg per team from its matches since 2012.
+    With `teams` only those teams are re-derived (ingest_results); the rest keep their entries.
+    """
     global TEAM_PROFILES, ADVANCED_TEAM_DATA
-    TEAM_PROFILES = {}
-    ADVANCED_TEAM_DATA = {} 
+    if teams is None:
+        TEAM_PROFILES = {}
+        ADVANCED_TEAM_DATA = {} 
+        teams = list(TEAM_STATS.keys())
     
     if results_df is None or 'date' not in results_df.columns:
-        for team in TEAM_STATS.keys():
+        for team in teams:
             true_vol = TEAM_STATS[team].get('volatility', 0.15)
             TEAM_PROFILES[team] = "Balanced"
             ADVANCED_TEAM_DATA[team] = {'type': 'Balanced', 'poss': 0.5, 'press': 0.5, 'dir': 0.5, 'vol': true_vol}
@@ -1085,40 +1672,43 @@ def engineer_team_signatures(results_df):
             TEAM_STATS[team]['pace_factor'] = 1.0
         return
 
-    modern_df = results_df[results_df['date'] > pd.to_datetime('2012-01-01')].copy()
+    modern_df = results_df[results_df['date'] > pd.to_datetime('2012-01-01')]
     global_avg = (modern_df['home_score'].mean() + modern_df['away_score'].mean()) / 2
-
-    for team in TEAM_STATS.keys():
-        t_games = modern_df[(modern_df['home_team'] == team) | (modern_df['away_team'] == team)]
+    if len(teams) < len(TEAM_STATS):
+        modern_df = modern_df[modern_df['home_team'].isin(teams) | modern_df['away_team'].isin(teams)]
+
+    # One row per (team, match); a team listed as both home and away counts once, as the home side
+    home, away = modern_df['home_team'].to_numpy(), modern_df['away_team'].to_numpy()
+    hs, as_ = modern_df['home_score'].to_numpy(), modern_df['away_score'].to_numpy()
+    keep = np.concatenate([np.ones(len(home), dtype=bool), home != away])
+    team = np.concatenate([home, away])[keep]
+    opp = pd.Series(np.concatenate([away, home])[keep])
+    scored = np.concatenate([hs, as_])[keep]
+    conceded = np.concatenate([as_, hs])[keep]
+
+    opp_ga = opp.map({t: s.get('ga_avg', global_avg) for t, s in TEAM_STATS.items()}).fillna(global_avg).to_numpy()
+    opp_gf = opp.map({t: s.get('gf_avg', global_avg) for t, s in TEAM_STATS.items()}).fillna(global_avg).to_numpy()
+
+    residuals = pd.DataFrame({
+        'team': team,
+        'off': scored / np.maximum(opp_ga, 0.4),
+        'def': conceded / np.maximum(opp_gf, 0.4),
+        'pace': (scored + conceded) / (global_avg * 2)
+    }).groupby('team')
+    means = residuals.mean().to_dict('index')
+    games = residuals.size().to_dict()
+
+    for team in teams:
         stats = TEAM_STATS[team]
         
         true_vol = stats.get('volatility', 0.15)
         
-        if len(t_games) < 5:
+        if games.get(team, 0) < 5:
             TEAM_PROFILES[team] = "Balanced"
             ADVANCED_TEAM_DATA[team] = {'type': 'Balanced', 'poss': 0.5, 'press': 0.5, 'dir': 0.5, 'vol': true_vol}
             continue
 
-        off_res = []
-        def_res = []
-        pace_res = [] 
-        
-        for _, row in t_games.iterrows():
-            is_home = row['home_team'] == team
-            opp = row['away_team'] if is_home else row['home_team']
-            scored = row['home_score'] if is_home else row['away_score']
-            conceded = row['away_score'] if is_home else row['home_score']
-            
-            opp_ga = TEAM_STATS.get(opp, {}).get('ga_avg', global_avg)
-            opp_gf = TEAM_STATS.get(opp, {}).get('gf_avg', global_avg)
-            
-            off_res.append(scored / max(opp_ga, 0.4))
-            def_res.append(conceded / max(opp_gf, 0.4))
-            pace_res.append((scored + conceded) / (global_avg * 2))
-
-        avg_off = np.mean(off_res)
-        avg_def = np.mean(def_res)
-        avg_pace = np.mean(pace_res)
+        avg_off, avg_def, avg_pace = means[team]['off'], means[team]['def'], means[team]['pace']
 
         if avg_pace > 1.15 and true_vol > 0.18: style = "Chaos & Intensity"
         elif avg_pace < 0.90 and avg_def < 0.95: style = "Compact Block"
@@ -1144,54 +1734,176 @@ def engineer_team_signatures(results_df):
         stats['pace_factor'] = avg_pace
 
 TEAM_PRECOMPUTE = {}
+PRECOMPUTE_ARRAYS = {}
+
+def _precompute_team(t, s):
+    """TEAM_PRECOMPUTE entry for one team from its TEAM_STATS profile and TEAM_TALENT"""
+    talent = TEAM_TALENT.get(t, {'talent_weight': 0.9, 'talent_score': 64.0})
+    
+    base_elo = s.get('elo', 1400)
+    
+    # 1. Translate FIFA rating (0-99) into a "Talent Elo" equivalent
+    # A rating of 85 = ~2000 Elo (Elite). A rating of 60 = ~1000 Elo (Minnow).
+    raw_rating = talent.get('talent_score', 70.0)
+    talent_elo = 1000 + (raw_rating - 60) * 40
+    
+    # 2. Apply the exact 55% / 45% mathematical blend
+    blended_elo = (base_elo * 0.57) + (talent_elo * 0.43)
+
+    pen_skill = s.get('pen_pct', 5) / 100.0 
+    experience = np.clip(s.get('ko_exp_weighted', 0) / 20.0, 0, 0.1)
+
+    # 3. Enhance the tactical impact to match the 45% weight
+    t_weight = talent.get('talent_weight', 1.0)
+    enhanced_t_weight = t_weight ** 1.35 # Amplifies the talent multiplier slightly
+
+    return {
+        'elo': blended_elo,
+        'xg_coeff': s.get('off', 1.0) * enhanced_t_weight,
+        'xga_coeff': s.get('def', 1.0) / enhanced_t_weight,
+        'pace': s.get('pace_factor', 1.0),
+        'vol': s.get('volatility', 0.15),
+        'composure': np.clip(s.get('ko_exp_weighted', 0) / 10.0, 0, 1.0),
+        'p_b': pen_skill + experience
+    }
 
 def precompute_match_data():
     global TEAM_PRECOMPUTE
     TEAM_PRECOMPUTE = {}
     for t, s in TEAM_STATS.items():
         clean_name = str(t).lower().strip()
-        talent = TEAM_TALENT.get(clean_name, {'talent_weight': 0.9, 'talent_score': 64.0})
-        
-        base_elo = s.get('elo', 1400)
-        
-        # 1. Translate FIFA rating (0-99) into a "Talent Elo" equivalent
-        # A rating of 85 = ~2000 Elo (Elite). A rating of 60 = ~1000 Elo (Minnow).
-        raw_rating = talent.get('talent_score', 70.0)
-        talent_elo = 1000 + (raw_rating - 60) * 40
-        
-        # 2. Apply the exact 55% / 45% mathematical blend
-        blended_elo = (base_elo * 0.57) + (talent_elo * 0.43)
-
-        pen_skill = s.get('pen_pct', 5) / 100.0 
-        experience = np.clip(s.get('ko_exp_weighted', 0) / 20.0, 0, 0.1)
-
-        # 3. Enhance the tactical impact to match the 45% weight
-        t_weight = talent.get('talent_weight', 1.0)
-        enhanced_t_weight = t_weight ** 1.35 # Amplifies the talent multiplier slightly
-
-        TEAM_PRECOMPUTE[clean_name] = {
-            'elo': blended_elo,
-            'xg_coeff': s.get('off', 1.0) * enhanced_t_weight,
-            'xga_coeff': s.get('def', 1.0) / enhanced_t_weight,
-            'pace': s.get('pace_factor', 1.0),
-            'vol': s.get('volatility', 0.15),
-            'composure': np.clip(s.get('ko_exp_weighted', 0) / 10.0, 0, 1.0),
-            'p_b': pen_skill + experience
-        }
+        TEAM_PRECOMPUTE[clean_name] = _precompute_team(clean_name, s)
 
-def sim_match(t1, t2, knockout=False):
-    # Convert both names to slugs immediately
-    t1 = get_slug(t1) 
-    t2 = get_slug(t2)
-    
-    p1 = TEAM_PRECOMPUTE.get(t1)
-    p2 = TEAM_PRECOMPUTE.get(t2)
+    # Flat arrays indexed by TEAM_REGISTRY id (plus a spare "missing" row at the end)
+    global PRECOMPUTE_ARRAYS
+    for t in TEAM_PRECOMPUTE:
+        TEAM_REGISTRY.intern(t)
+    PRECOMPUTE_ARRAYS = build_team_arrays(TEAM_REGISTRY.slugs + [None])
+    refresh_pair_tables()
 
-    # If a team is truly missing, return a draw/default 
-    # instead of a guaranteed 1-0 win for Team A.
-    if not p1 or not p2: 
-        return (t1, 0, 0, 'reg') if knockout else ('draw', 0, 0)
+def ingest_results(new_results):
+    """
+    Appends newly played results (same columns as results.csv) without replaying history.
+    Continues the Elo replay from ENGINE_STATE, appends the rows to RESULTS_TABLE and refreshes
+    TEAM_STATS, TEAM_HISTORY, the team signatures (profile, pace_factor) and TEAM_PRECOMPUTE
+    for the teams involved only. Returns the sorted list of touched slugs.
+
+    Rows already in RESULTS_TABLE (same date, home and away team) are skipped, so re-ingesting
+    a file is harmless. The rest may share the last stored date but not precede it.
+
+    Global normalisers (average goals, mean Elo, recency anchor, HFA) stay frozen at their
+    values from the last full build, so results drift slightly from a rebuild until the next one.
+    """
+    if not ENGINE_STATE:
+        raise RuntimeError("ingest_results() needs an initialized engine (run initialize_engine() first)")
+
+    required = ['date', 'home_team', 'away_team', 'home_score', 'away_score', 'tournament', 'neutral']
+    missing = [c for c in required if c not in new_results.columns]
+    if missing:
+        raise ValueError(f"ingest_results(): missing columns {missing}")
+
+    global RESULTS_TABLE
+    df = _clean_results(new_results, ENGINE_STATE['name_map'])
+
+    # Drop matches that are already stored (or listed twice)
+    key = ['date', 'home_team', 'away_team']
+    df = df.drop_duplicates(subset=key)
+    table = _results_table()
+    if table is not None and not df.empty:
+        stored = table[table['date'] >= df['date'].min()]
+        seen = set(zip(stored['date'], stored['home_team'], stored['away_team']))
+        df = df[[k not in seen for k in zip(df['date'], df['home_team'], df['away_team'])]]
+    if df.empty: return []
+
+    df = df.sort_values('date', kind='stable').reset_index(drop=True)
+    if df['date'].iloc[0] < ENGINE_STATE['last_date']:
+        raise ValueError(f"ingest_results(): new results must not precede {ENGINE_STATE['last_date'].date()}, got {df['date'].iloc[0].date()}")
+
+    # 1. New teams get a registry id, a blank profile and a starting rating
+    touched = list(dict.fromkeys(df['home_team'].tolist() + df['away_team'].tolist()))
+    n_before = len(TEAM_REGISTRY)
+    for t in touched:
+        TEAM_REGISTRY.intern(t)
+        if t not in TEAM_STATS:
+            TEAM_STATS[t] = new_team_stats()
+            ENGINE_STATE['aggregates'][t] = {'gf':0, 'ga':0, 'eff_games':0, 'opp_elo_sum':0}
+            ENGINE_STATE['forms'][t] = []
+            ENGINE_STATE['residuals'][t] = []
+    ratings = np.concatenate([ENGINE_STATE['ratings'], np.full(len(TEAM_REGISTRY) - len(ENGINE_STATE['ratings']), ELO_INITIAL_RATING)])
+
+    # 2. Continue the replay (same K/importance pipeline as the full build)
+    t_codes = TOURNAMENT_CLASSIFIER.encode(df['tournament'])
+    t_table = TOURNAMENT_CLASSIFIER.arrays()
+    df['k_factor'] = match_k_factors(t_codes, (df['home_score'] - df['away_score']).abs().values, df['home_team'], df['away_team'])
+    df['importance'] = match_importances(t_codes, df['date'])
+    matches = encode_elo_matches(df, calculated_hfa)
+
+    prev = ELO_CHECKPOINTS['matches']
+    all_days = np.concatenate([prev['day'][-1:], matches['day']])
+    new_months = monthly_checkpoints(all_days)
+    checkpoint_index = new_months[new_months > 0] - 1
+    replay = replay_elo(matches, ratings, checkpoints=checkpoint_index)
+
+    ELO_CHECKPOINTS['matches'] = {key: np.concatenate([prev[key], matches[key]]) for key in prev}
+    ELO_CHECKPOINTS['index'] = np.concatenate([ELO_CHECKPOINTS['index'], checkpoint_index + len(prev['day'])]).astype(np.int32)
+    ratings_width = len(TEAM_REGISTRY)
+    old_cp = ELO_CHECKPOINTS['ratings']
+    if old_cp.shape[1] < ratings_width:
+        pad = np.full((old_cp.shape[0], ratings_width - old_cp.shape[1]), ELO_INITIAL_RATING)
+        old_cp = np.hstack([old_cp, pad])
+    ELO_CHECKPOINTS['ratings'] = np.vstack([old_cp, replay['checkpoints']])
+    ENGINE_STATE['ratings'] = replay['ratings']
+    ENGINE_STATE['last_date'] = df['date'].iloc[-1]
+
+    for t, hist in build_elo_history(matches, replay, df['date']).items():
+        if t not in TEAM_HISTORY: TEAM_HISTORY[t] = {'dates': [], 'elo': []}
+        TEAM_HISTORY[t]['dates'].extend(hist['dates'])
+        TEAM_HISTORY[t]['elo'].extend(hist['elo'])
+
+    # 3. Bookkeeping for the new matches only
+    records = tally_opponent_records(matches, replay)
+    ped_val = pedigree_values(t_table['is_wc_finals'][t_codes], t_table['is_continental_finals'][t_codes])
+    for i, (h, a) in enumerate(zip(df['home_team'], df['away_team'])):
+        TEAM_STATS[h]['pedigree_pts'] += ped_val[i]
+        TEAM_STATS[a]['pedigree_pts'] += ped_val[i]
+    for t in touched:
+        tid = TEAM_REGISTRY.ids[t]
+        s = TEAM_STATS[t]
+        s['elo'] = float(replay['ratings'][tid])
+        for bucket, key in enumerate(OPPONENT_TIER_KEYS):
+            s[key] = (np.array(s[key]) + records[tid, bucket]).tolist()
+
+    latest_date = ENGINE_STATE['latest_date']
+    recent_idx = np.flatnonzero((df['date'] > ENGINE_STATE['relevance_cutoff']).to_numpy())
+    _record_recent_matches(_recent_rows(df, matches, replay, ped_val, recent_idx), latest_date, ENGINE_STATE['residuals'])
+    long_df = recent_results_long(df.iloc[recent_idx], latest_date)
+    _accumulate_recent_results(long_df, ENGINE_STATE['aggregates'], ENGINE_STATE['forms'])
+
+    # 4. Re-derive the profile, signature and match coefficients of the touched teams
+    if table is not None:
+        RESULTS_TABLE = pd.concat([table, df.reindex(columns=table.columns)], ignore_index=True)
+    for t in touched:
+        _finalize_team_stats(t, TEAM_STATS[t], ENGINE_STATE['aggregates'][t], ENGINE_STATE['forms'][t],
+                             ENGINE_STATE['residuals'].get(t), ENGINE_STATE['avg_goals_global'], ENGINE_STATE['global_elo_mean'])
+    engineer_team_signatures(RESULTS_TABLE, teams=touched)
+    for t in touched:
+        TEAM_PRECOMPUTE[t] = _precompute_team(t, TEAM_STATS[t])
+
+    global PRECOMPUTE_ARRAYS
+    if len(TEAM_REGISTRY) != n_before or not PRECOMPUTE_ARRAYS:
+        PRECOMPUTE_ARRAYS = build_team_arrays(TEAM_REGISTRY.slugs + [None])
+    else:
+        rows_ids = [TEAM_REGISTRY.ids[t] for t in touched]
+        fresh = build_team_arrays(touched)
+        for key, arr in fresh.items():
+            PRECOMPUTE_ARRAYS[key][rows_ids] = arr
+    refresh_pair_tables()
 
+    LOGGER.log(f"Ingested {len(df)} results, updated {len(touched)} teams")
+    return sorted(touched)
+
+def _match_lambdas(p1, p2, knockout):
+    """Expected goals (lam1, lam2) for a match between two TEAM_PRECOMPUTE entries"""
     # 1. Match Environment 
     pace = (p1['pace'] + p2['pace']) / 2
     # Knockout matches are tighter -> fewer goals = more draws = better underdog odds
@@ -1223,20 +1935,158 @@ def sim_match(t1, t2, knockout=False):
     # 6. Consistency/Clinical Bonus (Buff reduced to prevent elite over-performance)
     lam1 *= (1.0 + max(0, 0.15 - p1['vol']) * 0.25)
     lam2 *= (1.0 + max(0, 0.15 - p2['vol']) * 0.25)
+    return lam1, lam2
+
+class RandomBuffer:
+    """
+    Scalar random draws served from pre-generated blocks (drop-in for the Generator calls sim_match uses).
+    Uniforms and standard normals are drawn `block` at a time from the wrapped rng and handed out as
+    plain floats; gamma (Marsaglia-Tsang) and Poisson (inversion) are built from them, so a match
+    costs a few list reads instead of several NumPy calls. Same seed -> same stream, so runs stay replayable.
+    """
+    POISSON_INVERSION_MAX = 50.0  # above this the wrapped rng's own sampler is used
+
+    def __init__(self, rng=None, block=256):
+        self.rng = np.random if rng is None else rng
+        self.block = block
+        self._u, self._ui = [], 0
+        self._z, self._zi = [], 0
+        self._dc = {}  # shape -> Marsaglia-Tsang (d, c)
+
+    def _refill_u(self):
+        self._u, self._ui = self.rng.random(self.block).tolist(), 0
+
+    def _refill_z(self):
+        self._z, self._zi = self.rng.standard_normal(self.block).tolist(), 0
+
+    def random(self):
+        try: u = self._u[self._ui]
+        except IndexError:
+            self._refill_u()
+            u = self._u[0]
+        self._ui += 1
+        return u
+
+    def standard_normal(self):
+        try: z = self._z[self._zi]
+        except IndexError:
+            self._refill_z()
+            z = self._z[0]
+        self._zi += 1
+        return z
+
+    def gamma(self, shape, scale=1.0):
+        if shape < 1:
+            # Boost to shape + 1, then scale back with U^(1/shape)
+            return self.gamma(shape + 1.0, scale) * self.random() ** (1.0 / shape)
+        dc = self._dc.get(shape)
+        if dc is None:
+            d = shape - 1.0 / 3.0
+            dc = self._dc[shape] = (d, 1.0 / math.sqrt(9.0 * d))
+        d, c = dc
+        while True:
+            # Buffer reads are inlined: this loop is the hot spot of the scalar path
+            try: x = self._z[self._zi]
+            except IndexError:
+                self._refill_z()
+                x = self._z[0]
+            self._zi += 1
+            v = 1.0 + c * x
+            if v <= 0: continue
+            v = v * v * v
+            try: u = self._u[self._ui]
+            except IndexError:
+                self._refill_u()
+                u = self._u[0]
+            self._ui += 1
+            x2 = x * x
+            if u < 1.0 - 0.0331 * x2 * x2 or math.log(u) < 0.5 * x2 + d * (1.0 - v + math.log(v)):
+                return d * v * scale
+
+    def poisson(self, lam):
+        if lam > self.POISSON_INVERSION_MAX: return int(self.rng.poisson(lam))
+        try: u = self._u[self._ui]
+        except IndexError:
+            self._refill_u()
+            u = self._u[0]
+        self._ui += 1
+        # Sequential inversion of the CDF
+        k = 0
+        p = cdf = math.exp(-lam)
+        while u > cdf:
+            k += 1
+            p *= lam / k
+            cdf += p
+            if p == 0: break
+        return k
+
+    def shuffle(self, x):
+        """In-place Fisher-Yates shuffle"""
+        for i in range(len(x) - 1, 0, -1):
+            j = int(self.random() * (i + 1))
+            x[i], x[j] = x[j], x[i]
+
+def _match_params(t1, t2, knockout):
+    """
+    (goals1, goals2, et_goals1, et_goals2, shootout) for slugs t1 vs t2, or None if a team is missing.
+    Each goals entry is what sim_match rolls: a goal CDF row for World Cup pairs (from PAIR_TABLES),
+    otherwise a (lam, active_vol) pair computed from TEAM_PRECOMPUTE.
+    """
+    index = PAIR_TABLES.get('index', {})
+    i, j = index.get(t1), index.get(t2)
+    if i is not None and j is not None:
+        if not (PAIR_TABLES['present'][i] and PAIR_TABLES['present'][j]): return None
+        cdf = PAIR_TABLES['goal_cdf_rows']
+        phase = 1 if knockout else 0
+        return cdf[phase][i][j], cdf[phase][j][i], cdf[2][i][j], cdf[2][j][i], PAIR_TABLES['shootout'][i, j]
+
+    p1 = TEAM_PRECOMPUTE.get(t1)
+    p2 = TEAM_PRECOMPUTE.get(t2)
+    if not p1 or not p2: return None
+
+    lam1, lam2 = _match_lambdas(p1, p2, knockout)
+    # Underdogs keep high variance, top teams get a slightly smaller composure buff
+    ko_vol1 = p1['vol'] * (1.35 - (p1['composure'] * 0.35))
+    ko_vol2 = p2['vol'] * (1.35 - (p2['composure'] * 0.35))
+    vol1, vol2 = (ko_vol1, ko_vol2) if knockout else (p1['vol'], p2['vol'])
+
+    # Reduced the Elo advantage to make shootouts more of a 50/50 lottery
+    dr = p1['elo'] - p2['elo']
+    win_chance = 0.5 + (dr / 2000.0) + ((p1['composure'] - p2['composure']) * 0.15)
+    return (lam1, vol1), (lam2, vol2), (lam1 * 0.38, ko_vol1), (lam2 * 0.38, ko_vol2), np.clip(win_chance, 0.40, 0.60)
+
+def sim_match(t1, t2, knockout=False, rng=None):
+    """Name-based entry point (UI callers): resolves both names to slugs, then plays the match"""
+    return sim_match_resolved(get_slug(t1), get_slug(t2), knockout, rng)
+
+def sim_match_resolved(t1, t2, knockout=False, rng=None):
+    """
+    sim_match for already-resolved team keys (TEAM_REGISTRY slugs, e.g. from resolve_wc_groups).
+    No name normalization at all; results use the same keys.
+    Every draw comes from `rng` (an np.random.Generator or a RandomBuffer), or the global np.random state if None.
+    """
+    if rng is None: rng = np.random
+    params = _match_params(t1, t2, knockout)
+
+    # If a team is truly missing, return a draw/default 
+    # instead of a guaranteed 1-0 win for Team A.
+    if params is None: 
+        return (t1, 0, 0, 'reg') if knockout else ('draw', 0, 0)
+
+    goals1, goals2, et_goals1, et_goals2, shootout = params
 
     # 7. THE ROLL (Gamma-Poisson Distribution)
-    def roll(l, v, c, is_ko):
-        if is_ko:
-            # Underdogs keep high variance, top teams get a slightly smaller composure buff
-            active_vol = v * (1.35 - (c * 0.35))
-        else:
-            active_vol = v
+    def roll(spec):
+        if type(spec) is list:
+            # Precomputed goal CDF: inverse-CDF draw from a single uniform
+            return bisect.bisect_right(spec, rng.random())
+        l, active_vol = spec
         if active_vol > 0:
-            l = np.random.gamma(1/active_vol, l * active_vol)
-        return np.random.poisson(max(0.05, l))
+            l = rng.gamma(1/active_vol, l * active_vol)
+        return rng.poisson(max(0.05, l))
 
-    g1 = roll(lam1, p1['vol'], p1['composure'], knockout)
-    g2 = roll(lam2, p2['vol'], p2['composure'], knockout)
+    g1 = roll(goals1)
+    g2 = roll(goals2)
 
     # 8. RESOLUTION
     if g1 > g2: return (t1, g1, g2, 'reg') if knockout else (t1, g1, g2)
@@ -1244,28 +2094,167 @@ def sim_match(t1, t2, knockout=False):
     if not knockout: return 'draw', g1, g2
 
     # Extra Time (Approx 1/3 of match time)
-    g1 += roll(lam1 * 0.38, p1['vol'], p1['composure'], True)
-    g2 += roll(lam2 * 0.38, p2['vol'], p2['composure'], True)
+    g1 += roll(et_goals1)
+    g2 += roll(et_goals2)
     if g1 > g2: return t1, g1, g2, 'aet'
     if g2 > g1: return t2, g1, g2, 'aet'
     
     # Penalties (Pressure + Skill + Luck)
-    # Reduced the Elo advantage to make shootouts more of a 50/50 lottery
-    win_chance = 0.5 + (dr / 2000.0) + ((p1['composure'] - p2['composure']) * 0.15)
-    winner = t1 if random.random() < np.clip(win_chance, 0.40, 0.60) else t2
+    winner = t1 if rng.random() < shootout else t2
     return winner, g1, g2, 'pks'
 
-def run_simulation(verbose=False, quiet=False, fast_mode=False, finalized_slots=None):
-    structured_groups = {} if not fast_mode else None
-    structured_bracket = [] if not fast_mode else None
-    group_matches_log = {} if not fast_mode else None
+_lgamma = np.frompyfunc(math.lgamma, 1, 1)
+
+def _gamma_p(a, x):
+    """Regularized lower incomplete gamma P(a, x) (series / continued fraction), elementwise over arrays"""
+    a, x = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(x, dtype=float))
+    out = np.zeros(a.shape)
+    pos = x > 0
+    log_pre = np.zeros(a.shape)
+    log_pre[pos] = a[pos] * np.log(x[pos]) - x[pos] - _lgamma(a[pos]).astype(float)
+
+    series = pos & (x < a + 1)
+    if series.any():
+        aa, xx = a[series], x[series]
+        term = total = 1.0 / aa
+        n = aa.copy()
+        for _ in range(500):
+            n = n + 1
+            term = term * xx / n
+            total = total + term
+            if np.all(np.abs(term) < np.abs(total) * 1e-15): break
+        out[series] = np.minimum(1.0, total * np.exp(log_pre[series]))
+
+    # Lentz continued fraction for Q(a, x)
+    cf = pos & ~series
+    if cf.any():
+        aa, xx = a[cf], x[cf]
+        b = xx + 1 - aa
+        c = np.full(aa.shape, 1 / 1e-300)
+        d = 1 / b
+        h = d
+        for i in range(1, 500):
+            an = -i * (i - aa)
+            b = b + 2
+            d = an * d + b
+            d = np.where(np.abs(d) < 1e-300, 1e-300, d)
+            c = b + an / c
+            c = np.where(np.abs(c) < 1e-300, 1e-300, c)
+            d = 1 / d
+            delta = d * c
+            h = h * delta
+            if np.all(np.abs(delta - 1) < 1e-15): break
+        out[cf] = np.maximum(0.0, 1.0 - np.exp(log_pre[cf]) * h)
+    return out if out.ndim else float(out)
+
+def _goal_pmf(lam, vol, max_goals):
+    """
+    Exact goal distribution of sim_match.roll, truncated at max_goals.
+    Gamma(1/vol, lam*vol)-mixed Poisson is a negative binomial; the 0.05
+    floor on the Poisson rate is handled by splitting the gamma at 0.05.
+    lam / vol may be arrays: the result gets a trailing goals axis.
+    """
+    floor = 0.05
+    lam, vol = np.broadcast_arrays(np.asarray(lam, dtype=float), np.asarray(vol, dtype=float))
+    lam, vol = lam[..., None], vol[..., None]
+    goals = np.arange(max_goals + 1)
+    log_fact = np.concatenate([[0.0], np.cumsum(np.log(goals[1:]))])
+    floor_pmf = np.exp(goals * math.log(floor) - floor - log_fact)
+
+    # No volatility: plain Poisson
+    rate = np.maximum(floor, lam)
+    pmf = np.exp(goals * np.log(rate) - rate - log_fact)
+    has_vol = (vol > 0)[..., 0]
+    if not has_vol.any(): return pmf
+
+    r = 1.0 / vol[has_vol]
+    theta = lam[has_vol] * vol[has_vol]
+    # log Gamma(x + r) - log Gamma(r) = sum_{m < x} log(r + m)
+    log_rise = np.concatenate([np.zeros(r.shape), np.cumsum(np.log(r + goals[:-1]), axis=-1)], axis=-1)
+    log_nb = (log_rise - log_fact + r * np.log(1 / (1 + theta)) + goals * np.log(theta / (1 + theta)))
+
+    # Part of the gamma above the floor keeps its own rate, the rest plays at the floor.
+    # Q(x + r, y) for every x from Q(r, y) and Q(a + 1, y) = Q(a, y) + y^a e^-y / Gamma(a + 1)
+    y = floor * (1 + theta) / theta
+    log_gamma_next = _lgamma(r + 1).astype(float) - np.log(r) + log_rise[..., 1:]  # log Gamma(r + x + 1)
+    log_steps = (r + goals[:-1]) * np.log(y) - y - log_gamma_next
+    above = (1.0 - _gamma_p(r, y)) + np.concatenate([np.zeros(r.shape), np.cumsum(np.exp(log_steps), axis=-1)], axis=-1)
+    below = _gamma_p(r, floor / theta)
+    pmf[has_vol] = np.exp(log_nb) * np.minimum(above, 1.0) + floor_pmf * below
+    return pmf
+
+def match_probabilities(t1, t2, knockout=False, max_goals=10):
+    """
+    Closed-form version of sim_match (no sampling).
+    Returns {'scores': (max_goals+1)^2 matrix of 90-minute scorelines [g1, g2],
+             'win' / 'draw' / 'loss': 90-minute result for t1,
+             'xg': expected goals (t1, t2)}
+    Knockouts add the extra-time / penalty split for t1:
+             'aet_win', 'aet_loss', 'pks_win', 'pks_loss', 'advance'
+    """
+    t1 = get_slug(t1)
+    t2 = get_slug(t2)
+    p1 = TEAM_PRECOMPUTE.get(t1)
+    p2 = TEAM_PRECOMPUTE.get(t2)
+
+    scores = np.zeros((max_goals + 1, max_goals + 1))
+    if not p1 or not p2:
+        # Mirrors sim_match: 0-0 draw, or team 1 through in a knockout
+        scores[0, 0] = 1.0
+        res = {'scores': scores, 'win': 0.0, 'draw': 1.0, 'loss': 0.0, 'xg': (0.0, 0.0)}
+        if knockout:
+            res.update({'win': 1.0, 'draw': 0.0, 'aet_win': 0.0, 'aet_loss': 0.0,
+                        'pks_win': 0.0, 'pks_loss': 0.0, 'advance': 1.0})
+        return res
 
+    dr = p1['elo'] - p2['elo']
+    lam1, lam2 = _match_lambdas(p1, p2, knockout)
+
+    def active_vol(p):
+        return p['vol'] * (1.35 - (p['composure'] * 0.35)) if knockout else p['vol']
+
+    # Outcome probabilities use a deep cap so the truncation error is negligible
+    cap = max(max_goals, 30)
+    pmf1 = _goal_pmf(lam1, active_vol(p1), cap)
+    pmf2 = _goal_pmf(lam2, active_vol(p2), cap)
+    full = np.outer(pmf1, pmf2)
+
+    win = float(np.tril(full, -1).sum())
+    draw = float(np.trace(full))
+    loss = float(np.triu(full, 1).sum())
+    goals = np.arange(cap + 1)
+
+    res = {
+        'scores': full[:max_goals + 1, :max_goals + 1].copy(),
+        'win': win, 'draw': draw, 'loss': loss,
+        'xg': (float(goals @ pmf1), float(goals @ pmf2))
+    }
+
+    if knockout:
+        # Extra time always uses the knockout volatility (see sim_match)
+        et1 = _goal_pmf(lam1 * 0.38, p1['vol'] * (1.35 - (p1['composure'] * 0.35)), cap)
+        et2 = _goal_pmf(lam2 * 0.38, p2['vol'] * (1.35 - (p2['composure'] * 0.35)), cap)
+        et = np.outer(et1, et2)
+        et_win, et_draw, et_loss = np.tril(et, -1).sum(), np.trace(et), np.triu(et, 1).sum()
+
+        win_chance = 0.5 + (dr / 2000.0) + ((p1['composure'] - p2['composure']) * 0.15)
+        pk = float(np.clip(win_chance, 0.40, 0.60))
+
+        res.update({
+            'aet_win': float(draw * et_win), 'aet_loss': float(draw * et_loss),
+            'pks_win': float(draw * et_draw * pk), 'pks_loss': float(draw * et_draw * (1 - pk)),
+        })
+        res['advance'] = win + res['aet_win'] + res['pks_win']
+    return res
+
+def get_wc_groups(finalized_slots=None):
+    """The 12 World Cup 2026 groups (A-L), with playoff slots filled in"""
     if finalized_slots is None:
         slots = FINALIZED_SLOTS.copy()
     else:
         slots = finalized_slots
 
-    groups = {
+    return {
         'A': ['mexico', 'south africa', 'south korea', slots['Path D']],
         'B': ['canada', 'switzerland', 'qatar', slots['Path A']],
         'C': ['brazil', 'morocco', 'haiti', 'scotland'],
@@ -1280,18 +2269,36 @@ def run_simulation(verbose=False, quiet=False, fast_mode=False, finalized_slots=
         'L': ['england', 'croatia', 'ghana', 'panama']
     }
 
-    clean_groups = {}
-    for grp, teams in groups.items():
-        # Changed this from .lower().strip() to get_slug
-        clean_groups[grp] = [get_slug(team) for team in teams]
-    groups = clean_groups
+@functools.lru_cache(maxsize=32)
+def _resolved_wc_groups(slot_items):
+    groups = get_wc_groups(dict(slot_items))
+    return {grp: tuple(get_slug(team) for team in teams) for grp, teams in groups.items()}
+
+def resolve_wc_groups(finalized_slots=None):
+    """get_wc_groups with every team already slugged (resolved once per distinct set of playoff slots)"""
+    slots = FINALIZED_SLOTS if finalized_slots is None else finalized_slots
+    return {grp: list(teams) for grp, teams in _resolved_wc_groups(tuple(sorted(slots.items()))).items()}
+
+def simulation_rng(seed, k):
+    """Generator of simulation (or batch chunk) #k in a run seeded with `seed`: child k of SeedSequence(seed).spawn"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(k,)))
+
+def run_simulation(verbose=False, quiet=False, fast_mode=False, finalized_slots=None, rng=None):
+    # Buffered draws: the ~100 scalar matches share a few bulk refills instead of ~500 NumPy calls
+    if not isinstance(rng, RandomBuffer): rng = RandomBuffer(rng)
+    structured_groups = {} if not fast_mode else None
+    structured_bracket = [] if not fast_mode else None
+    group_matches_log = {} if not fast_mode else None
+
+    # Teams are resolved to slugs once; every match below goes through the slug-free path
+    groups = resolve_wc_groups(finalized_slots)
 
     group_results_lists = {}
     third_place =[]
     
     for grp, teams in groups.items():
         teams_shuffled = teams.copy()
-        np.random.shuffle(teams_shuffled)
+        rng.shuffle(teams_shuffled)
         
         table_stats = {t: {'p':0, 'gd':0, 'gf':0, 'ga':0, 'w':0, 'd':0, 'l':0} for t in teams_shuffled}
         if not fast_mode: group_matches_log[grp] =[]
@@ -1299,7 +2306,7 @@ def run_simulation(verbose=False, quiet=False, fast_mode=False, finalized_slots=
         for i in range(len(teams_shuffled)):
             for j in range(i+1, len(teams_shuffled)):
                 t1, t2 = teams_shuffled[i], teams_shuffled[j]
-                w, g1, g2 = sim_match(t1, t2)
+                w, g1, g2 = sim_match_resolved(t1, t2, rng=rng)
                 
                 if not fast_mode:
                     group_matches_log[grp].append({'t1': t1, 't2': t2, 'g1': g1, 'g2': g2})
@@ -1397,7 +2404,7 @@ def run_simulation(verbose=False, quiet=False, fast_mode=False, finalized_slots=
         round_matches_log = [] if not fast_mode else None
         
         for t1, t2 in bracket_matchups:
-            w, g1, g2, method = sim_match(t1, t2, knockout=True)
+            w, g1, g2, method = sim_match_resolved(t1, t2, knockout=True, rng=rng)
             next_round_teams.append(w)
             
             l = t2 if w == t1 else t1
@@ -1414,7 +2421,7 @@ def run_simulation(verbose=False, quiet=False, fast_mode=False, finalized_slots=
             runner_up = current_round_losers[0]
             
             t3_1, t3_2 = semi_losers[0], semi_losers[1]
-            w_3rd, g3_1, g3_2, method_3rd = sim_match(t3_1, t3_2, knockout=True)
+            w_3rd, g3_1, g3_2, method_3rd = sim_match_resolved(t3_1, t3_2, knockout=True, rng=rng)
             third_place_winner = w_3rd 
             
             if not fast_mode:
@@ -1440,37 +2447,14 @@ def run_simulation(verbose=False, quiet=False, fast_mode=False, finalized_slots=
     }
 
 def get_historical_elo(cutoff_date='2022-11-20'):
-    results_df = load_data()[0]
-    if results_df is None or 'date' not in results_df.columns: return {}
-
-    results_df['date'] = pd.to_datetime(results_df['date'], errors='coerce')
-    results_df = results_df.dropna(subset=['date'])
-    results_df = results_df.sort_values('date')
-    historic_df = results_df[results_df['date'] < pd.to_datetime(cutoff_date)]
+    """Elo ratings (slug -> rating) from every match before `cutoff_date`, via the replay checkpoints"""
+    ratings = ratings_as_of(cutoff_date)
+    if ratings is None: return {}
 
-    team_elo = {}
-    INITIAL_RATING = 1200
-    
-    for _, row in historic_df.iterrows():
-        h = row['home_team'].lower().strip()
-        a = row['away_team'].lower().strip()
-        hs, as_ = row['home_score'], row['away_score']
-        
-        rh = team_elo.get(h, INITIAL_RATING)
-        ra = team_elo.get(a, INITIAL_RATING)
-        
-        gd = abs(hs - as_)
-        k = get_k_factor(row['tournament'], gd, h, a)
-        
-        dr = rh - ra + (100 if not row['neutral'] else 0)
-        we = 1 / (10**(-dr/500) + 1)
-        W = 1 if hs > as_ else (0 if as_ > hs else 0.5)
-        
-        change = k * (W - we)
-        team_elo[h] = rh + change
-        team_elo[a] = ra - change
-
-    return team_elo
+    matches = ELO_CHECKPOINTS['matches']
+    stop = int(np.searchsorted(matches['day'], (pd.to_datetime(cutoff_date) - ELO_EPOCH).days, side='left'))
+    played = np.unique(np.concatenate([matches['home'][:stop], matches['away'][:stop]]))
+    return {TEAM_REGISTRY.slugs[tid]: float(ratings[tid]) for tid in played.tolist()}
 
 WC_2022_GROUPS = {
     'A': ['qatar', 'ecuador', 'senegal', 'netherlands'],
@@ -1482,3 +2466,507 @@ WC_2022_GROUPS = {
     'G': ['brazil', 'serbia', 'switzerland', 'cameroon'],
     'H': ['portugal', 'ghana', 'uruguay', 'south korea']
 }
+
+# =============================================================================
+# --- PART 4: VECTORIZED BATCH ENGINE ---
+# =============================================================================
+# Same goal / extra-time / penalty model as sim_match, but every match of N
+# tournaments is played at once as NumPy arrays instead of 104 scalar calls.
+
+BATCH_STAGES = ['Group Stage', 'Round of 32', 'Round of 16', 'Quarter-finals', 'Semi-finals', 'Final', 'Champion']
+R32_WINNER_SLOTS = ['A', 'B', 'D', 'E', 'G', 'I', 'K', 'L']
+GROUP_LETTERS = 'ABCDEFGHIJKL'
+
+# Pairings inside a shuffled group of 4 (same order as the run_simulation loop)
+GROUP_PAIRS = [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)]
+
+# R32 bracket as (group, position) for a group team, or ('3', winner_slot)
+# for a best-third-place team. Same order as bracket_matchups in run_simulation.
+R32_BRACKET = [
+    (('H', 0), ('A', 1)), (('A', 0), ('3', 'A')), (('C', 0), ('B', 1)), (('E', 0), ('3', 'E')),
+    (('L', 0), ('3', 'L')), (('D', 0), ('3', 'D')), (('G', 0), ('3', 'G')), (('C', 1), ('D', 1)),
+    (('J', 0), ('E', 1)), (('B', 0), ('3', 'B')), (('F', 0), ('G', 1)), (('K', 0), ('3', 'K')),
+    (('I', 0), ('3', 'I')), (('H', 1), ('I', 1)), (('J', 1), ('K', 1)), (('L', 1), ('F', 1)),
+]
+
+def build_team_arrays(slugs):
+    """Pulls TEAM_PRECOMPUTE into flat arrays (one row per slug) for batch simulation"""
+    n = len(slugs)
+    arrays = {
+        'elo': np.zeros(n), 'xg_coeff': np.ones(n), 'xga_coeff': np.ones(n),
+        'pace': np.ones(n), 'vol': np.full(n, 0.15), 'composure': np.zeros(n),
+        'present': np.zeros(n, dtype=bool)
+    }
+    for i, t in enumerate(slugs):
+        p = TEAM_PRECOMPUTE.get(t)
+        if not p: continue
+        for key in ['elo', 'xg_coeff', 'xga_coeff', 'pace', 'vol', 'composure']:
+            arrays[key][i] = p[key]
+        arrays['present'][i] = True
+    return arrays
+
+def _active_vol(vol, composure, is_ko):
+    """Effective volatility: underdogs keep high variance in knockouts, composed teams lose some"""
+    return np.where(is_ko, vol * (1.35 - (composure * 0.35)), vol)
+
+def _roll_goals(lam, active_vol, rng):
+    """Vectorized version of sim_match.roll (Gamma-Poisson goal draw) for given effective volatilities"""
+    has_vol = active_vol > 0
+    safe_vol = np.where(has_vol, active_vol, 1.0)
+    mixed = rng.gamma(1 / safe_vol, lam * safe_vol)
+    lam = np.where(has_vol, mixed, lam)
+    return rng.poisson(np.maximum(0.05, lam))
+
+def _pair_lambdas(arrays, i1, i2, knockout):
+    """Vectorized _match_lambdas: expected goals (lam1, lam2) for team rows i1 vs i2"""
+    # 1. Match Environment
+    pace = (arrays['pace'][i1] + arrays['pace'][i2]) / 2
+    intensity = np.where(knockout, 0.87, 1.0)
+    total_match_goals = 2.91 * pace * intensity
+
+    dr = arrays['elo'][i1] - arrays['elo'][i2]
+
+    # 2. Elo Probability Distribution
+    active_divisor = np.where(knockout, 660, 620)
+    win_prob = 1 / (10**(-dr / active_divisor) + 1)
+    ratio = np.clip(win_prob / np.maximum(0.001, (1.0 - win_prob)), 0.05, 20.0)
+
+    elo_lam1 = (total_match_goals / 2) * (ratio ** 0.5)
+    elo_lam2 = (total_match_goals / 2) / (ratio ** 0.5)
+
+    # 3. Tactical Stat Flavor
+    stat_lam1 = (total_match_goals / 2) * arrays['xg_coeff'][i1] * arrays['xga_coeff'][i2]
+    stat_lam2 = (total_match_goals / 2) * arrays['xg_coeff'][i2] * arrays['xga_coeff'][i1]
+
+    # 4. The Master Blend + Consistency Bonus
+    lam1 = np.maximum(0.1, (elo_lam1 * 0.65) + (stat_lam1 * 0.35))
+    lam2 = np.maximum(0.1, (elo_lam2 * 0.65) + (stat_lam2 * 0.35))
+    lam1 = lam1 * (1.0 + np.maximum(0, 0.15 - arrays['vol'][i1]) * 0.25)
+    lam2 = lam2 * (1.0 + np.maximum(0, 0.15 - arrays['vol'][i2]) * 0.25)
+    return lam1, lam2
+
+def _shootout_chance(arrays, i1, i2):
+    """Team 1's penalty shootout win chance (Elo and composure, squeezed towards a 50/50 lottery)"""
+    dr = arrays['elo'][i1] - arrays['elo'][i2]
+    win_chance = 0.5 + (dr / 2000.0) + ((arrays['composure'][i1] - arrays['composure'][i2]) * 0.15)
+    return np.clip(win_chance, 0.40, 0.60)
+
+# Pairwise match parameters for the World Cup field (see build_pair_tables)
+PAIR_TABLES = {}
+# Goal tables are cut here, the (< 1e-6) tail is lumped into the top count
+MAX_TABLE_GOALS = 30
+
+def _sample_goals(tables, rows, u):
+    """
+    Inverse-CDF goal draws: rows are flat goal_cdf rows ((phase * n + i) * n + j), u uniforms in [0, 1).
+    Walks each row up from 0 goals, so the work follows the goals actually scored
+    (a single searchsorted over the whole table measured ~3x slower).
+    """
+    cdf = tables['goal_cdf'].reshape(-1)
+    start = rows * (MAX_TABLE_GOALS + 1)
+    goals = np.zeros(np.shape(rows), dtype=np.intp)
+    idx = np.flatnonzero(u >= cdf[start])
+    while idx.size:
+        goals[idx] += 1
+        idx = idx[u[idx] >= cdf[start[idx] + goals[idx]]]
+    return goals
+
+def build_pair_tables(slugs):
+    """
+    Everything sim_match derives from a team pair, precomputed for all ordered pairs of `slugs`:
+      lam1 / lam2 : (2, n, n) expected goals, indexed [phase, i, j] (phase 0 = group, 1 = knockout)
+      vol         : (2, n) effective volatility per phase (it only depends on the team itself)
+      shootout    : (n, n) chance that i beats j on penalties
+      goal_cdf    : (3, n, n, MAX_TABLE_GOALS + 1) CDF of the goals i scores against j, indexed
+                    [phase, i, j] (phase 2 = extra time); the exact Gamma-Poisson law from _goal_pmf
+    plus 'index' (slug -> row) and the per-team arrays from build_team_arrays.
+    """
+    tables = build_team_arrays(slugs)
+    n = len(slugs)
+    i1, i2 = np.divmod(np.arange(n * n), n)
+    tables['lam1'], tables['lam2'] = np.empty((2, n, n)), np.empty((2, n, n))
+    for phase, knockout in enumerate((False, True)):
+        lam1, lam2 = _pair_lambdas(tables, i1, i2, knockout)
+        tables['lam1'][phase] = lam1.reshape(n, n)
+        tables['lam2'][phase] = lam2.reshape(n, n)
+    tables['vol'] = np.stack([_active_vol(tables['vol'], tables['composure'], knockout) for knockout in (False, True)])
+    tables['shootout'] = _shootout_chance(tables, i1, i2).reshape(n, n)
+    tables['index'] = {t: i for i, t in enumerate(slugs)}
+
+    # lam2[phase, i, j] == lam1[phase, j, i], so one table per phase covers both sides
+    lam = np.stack([tables['lam1'][0], tables['lam1'][1], tables['lam1'][1] * 0.38])
+    vol = np.stack([tables['vol'][0], tables['vol'][1], tables['vol'][1]])[:, :, None]
+    cdf = np.cumsum(_goal_pmf(lam, np.broadcast_to(vol, lam.shape), MAX_TABLE_GOALS), axis=-1)
+    cdf[..., -1] = 1.0
+    tables['goal_cdf'] = cdf
+    tables['goal_cdf_rows'] = cdf.tolist()  # for bisect in the scalar sim_match
+    return tables
+
+def pair_tables_for(slugs):
+    """PAIR_TABLES restricted to `slugs` (rows in that order); built fresh if any team is not covered"""
+    index = PAIR_TABLES.get('index', {})
+    if not all(t in index for t in slugs):
+        return build_pair_tables(slugs)
+    rows = np.array([index[t] for t in slugs], dtype=np.intp)
+    tables = {key: PAIR_TABLES[key][rows] for key in ['elo', 'xg_coeff', 'xga_coeff', 'pace', 'composure', 'present']}
+    tables['lam1'] = PAIR_TABLES['lam1'][:, rows[:, None], rows[None, :]]
+    tables['lam2'] = PAIR_TABLES['lam2'][:, rows[:, None], rows[None, :]]
+    tables['vol'] = PAIR_TABLES['vol'][:, rows]
+    tables['shootout'] = PAIR_TABLES['shootout'][rows[:, None], rows[None, :]]
+    tables['goal_cdf'] = PAIR_TABLES['goal_cdf'][:, rows[:, None], rows[None, :]]
+    tables['index'] = {t: i for i, t in enumerate(slugs)}
+    return tables
+
+def refresh_pair_tables():
+    """Rebuilds PAIR_TABLES for every team that can appear in a World Cup draw"""
+    global PAIR_TABLES
+    groups = get_wc_groups()
+    field = [get_slug(t) for t in WC_TEAMS] + [get_slug(t) for grp in GROUP_LETTERS for t in groups[grp]]
+    PAIR_TABLES = build_pair_tables(list(dict.fromkeys(field)))
+
+def _sim_match_arrays(arrays, i1, i2, knockout, rng):
+    """
+    Plays len(i1) matches of team rows i1 vs i2 at once.
+    arrays is either per-team arrays (build_team_arrays) or pair tables (build_pair_tables),
+    in which case goals are inverse-CDF draws from goal_cdf (one uniform per team).
+    knockout is a bool or a per-match bool mask.
+    Returns (g1, g2, t1_wins, method) where method is 0=reg, 1=aet, 2=pks.
+    For group games t1_wins is only meaningful when g1 != g2.
+    """
+    knockout = np.broadcast_to(np.asarray(knockout, dtype=bool), np.shape(i1))
+
+    # 1-2. Match parameters and the Roll
+    if 'goal_cdf' in arrays:
+        n = len(arrays['present'])
+        def roll(phase, a, b):
+            return _sample_goals(arrays, (phase * n + a) * n + b, rng.random(np.shape(a)))
+        phase = knockout.astype(np.intp)
+        g1, g2 = roll(phase, i1, i2), roll(phase, i2, i1)
+        def extra_time(m):
+            return roll(2, i1[m], i2[m]), roll(2, i2[m], i1[m])
+    else:
+        lam1, lam2 = _pair_lambdas(arrays, i1, i2, knockout)
+        comp1, comp2 = arrays['composure'][i1], arrays['composure'][i2]
+        vol1 = _active_vol(arrays['vol'][i1], comp1, knockout)
+        vol2 = _active_vol(arrays['vol'][i2], comp2, knockout)
+        ko_vol1 = _active_vol(arrays['vol'][i1], comp1, True)
+        ko_vol2 = _active_vol(arrays['vol'][i2], comp2, True)
+        g1 = _roll_goals(lam1, vol1, rng)
+        g2 = _roll_goals(lam2, vol2, rng)
+        def extra_time(m):
+            return _roll_goals(lam1[m] * 0.38, ko_vol1[m], rng), _roll_goals(lam2[m] * 0.38, ko_vol2[m], rng)
+
+    # Missing teams: 0-0 draw in the groups, team 1 through in knockouts (as in sim_match)
+    missing = ~(arrays['present'][i1] & arrays['present'][i2])
+    g1[missing] = 0
+    g2[missing] = 0
+
+    method = np.zeros(len(g1), dtype=np.int8)
+
+    # 3. Extra Time for the level knockout games
+    level = (g1 == g2) & knockout & ~missing
+    if level.any():
+        et1, et2 = extra_time(level)
+        g1[level] += et1
+        g2[level] += et2
+        method[level] = 1
+    t1_wins = (g1 > g2) | (missing & knockout)
+
+    # 4. Penalties for whatever is still level
+    pens = level & (g1 == g2)
+    if pens.any():
+        if 'shootout' in arrays:
+            win_chance = arrays['shootout'][i1[pens], i2[pens]]
+        else:
+            win_chance = _shootout_chance(arrays, i1[pens], i2[pens])
+        t1_wins[pens] = rng.random(int(pens.sum())) < win_chance
+        method[pens] = 2
+
+    return g1, g2, t1_wins, method
+
+def get_team_ids(names):
+    """Resolves team names/slugs to TEAM_REGISTRY ids (-1 if unknown)"""
+    return TEAM_REGISTRY.ids_of(names)
+
+def sim_matches(home_ids, away_ids, knockout_mask=False, rng=None):
+    """
+    Batched sim_match. home_ids / away_ids are arrays of team ids from
+    get_team_ids(); knockout_mask is a bool or a per-match bool array.
+    Returns (winner_ids, g1, g2, method) arrays, where winner_ids is -1 for
+    a drawn group game and method is 0=reg, 1=aet, 2=pks.
+    """
+    if rng is None: rng = np.random
+    home_ids = np.asarray(home_ids, dtype=np.int64)
+    away_ids = np.asarray(away_ids, dtype=np.int64)
+
+    # Unknown ids (-1) point at the spare last row, which is flagged as not present
+    i1 = np.where(home_ids >= 0, home_ids, len(TEAM_REGISTRY))
+    i2 = np.where(away_ids >= 0, away_ids, len(TEAM_REGISTRY))
+
+    g1, g2, t1_wins, method = _sim_match_arrays(PRECOMPUTE_ARRAYS, i1, i2, knockout_mask, rng)
+    knockout_mask = np.broadcast_to(np.asarray(knockout_mask, dtype=bool), home_ids.shape)
+    winner_ids = np.where(t1_wins, home_ids, np.where((g2 > g1) | knockout_mask, away_ids, -1))
+    return winner_ids, g1, g2, method
+
+def _r32_slot_table():
+    """
+    Turns R32_LOOKUP into a (4096, 8) array indexed by the 12-bit mask of
+    groups whose 3rd-place team advanced. Row = target group index for each
+    winner slot in R32_WINNER_SLOTS, or -1 if the combination is unknown.
+    """
+    table = np.full((1 << 12, len(R32_WINNER_SLOTS)), -1, dtype=np.int8)
+    for combo_key, assignments in R32_LOOKUP.items():
+        mask = 0
+        for letter in combo_key:
+            if letter in GROUP_LETTERS: mask |= 1 << GROUP_LETTERS.index(letter)
+        for s, winner_slot in enumerate(R32_WINNER_SLOTS):
+            target = assignments.get(winner_slot, '')
+            # Targets outside the advancing groups fall back to the best 3rd (see run_simulation)
+            if target in GROUP_LETTERS and mask & (1 << GROUP_LETTERS.index(target)):
+                table[mask, s] = GROUP_LETTERS.index(target)
+            else:
+                table[mask, s] = 12
+    return table
+
+def _table_key(pts, gd, gf):
+    """Single sortable integer for the (points, goal difference, goals for) tiebreak"""
+    return (pts.astype(np.int64) * 1000 + (gd.astype(np.int64) + 500)) * 1000 + gf
+
+def _run_batch_chunk(arrays, n, rng, slot_table):
+    n_groups = len(GROUP_LETTERS)
+    sims = np.arange(n)
+
+    # 1. GROUP STAGE: shuffle every group, then play all 72 matches of every tournament together
+    shuffled = np.argsort(rng.random((n, n_groups, 4)), axis=2)
+    teams_pos = shuffled + (np.arange(n_groups) * 4)[None, :, None]
+
+    t1 = np.stack([teams_pos[:, :, i] for i, j in GROUP_PAIRS], axis=2)
+    t2 = np.stack([teams_pos[:, :, j] for i, j in GROUP_PAIRS], axis=2)
+    g1, g2, _, _ = _sim_match_arrays(arrays, t1.ravel(), t2.ravel(), False, rng)
+    g1 = g1.reshape(t1.shape)
+    g2 = g2.reshape(t1.shape)
+
+    pts = np.zeros((n, n_groups, 4), dtype=np.int16)
+    gf = np.zeros((n, n_groups, 4), dtype=np.int16)
+    ga = np.zeros((n, n_groups, 4), dtype=np.int16)
+    for k, (i, j) in enumerate(GROUP_PAIRS):
+        a, b = g1[:, :, k], g2[:, :, k]
+        gf[:, :, i] += a; ga[:, :, i] += b
+        gf[:, :, j] += b; ga[:, :, j] += a
+        pts[:, :, i] += np.where(a > b, 3, np.where(a == b, 1, 0))
+        pts[:, :, j] += np.where(b > a, 3, np.where(a == b, 1, 0))
+    gd = gf - ga
+
+    # 2. GROUP RANKING (stable sort keeps the shuffled order on full ties, like sorted())
+    key = _table_key(pts, gd, gf)
+    order = np.argsort(-key, axis=2, kind='stable')
+    standings = np.take_along_axis(teams_pos, order, axis=2)
+
+    group_position = np.zeros((n, n_groups * 4), dtype=np.int8)
+    rows = np.repeat(sims, n_groups * 4)
+    group_position[rows, standings.reshape(n, -1).ravel()] = np.tile(np.tile(np.arange(1, 5), n_groups), n)
+    team_pts = np.zeros((n, n_groups * 4), dtype=np.int16)
+    team_gf = np.zeros((n, n_groups * 4), dtype=np.int16)
+    team_ga = np.zeros((n, n_groups * 4), dtype=np.int16)
+    team_pts[rows, teams_pos.reshape(n, -1).ravel()] = pts.reshape(n, -1).ravel()
+    team_gf[rows, teams_pos.reshape(n, -1).ravel()] = gf.reshape(n, -1).ravel()
+    team_ga[rows, teams_pos.reshape(n, -1).ravel()] = ga.reshape(n, -1).ravel()
+
+    # 3. BEST THIRD-PLACE TEAMS (ties go to the earlier group, like the stable sort over A-L)
+    third_key = np.take_along_axis(key, order, axis=2)[:, :, 2]
+    third_rank = np.argsort(-third_key, axis=1, kind='stable')[:, :8]
+    third_team = standings[:, :, 2]
+    mask = np.bitwise_or.reduce(1 << third_rank, axis=1)
+
+    # 4. R32_LOOKUP SLOTTING
+    targets = slot_table[mask].astype(np.int64)
+    known = targets[:, 0] >= 0
+    best_third_group = third_rank[:, 0]
+    targets = np.where(targets == 12, best_third_group[:, None], targets)
+    # Unknown combinations: fill the winner slots in best-3rd ranking order
+    targets = np.where(known[:, None], targets, third_rank)
+    slot_teams = np.take_along_axis(third_team, targets, axis=1)
+
+    def resolve(entry):
+        grp, pos = entry
+        if grp == '3':
+            return slot_teams[:, R32_WINNER_SLOTS.index(pos)]
+        return standings[:, GROUP_LETTERS.index(grp), pos]
+
+    bracket = np.stack([np.stack([resolve(a), resolve(b)], axis=1) for a, b in R32_BRACKET], axis=1)
+
+    # 5. KNOCKOUT ROUNDS
+    stage = np.zeros((n, n_groups * 4), dtype=np.int8)
+    semi_losers = None
+    runner_up = None
+    for stage_idx in range(1, 6):
+        m = bracket.shape[1]
+        k1, k2 = bracket[:, :, 0], bracket[:, :, 1]
+        stage[np.repeat(sims, m), k1.ravel()] = stage_idx
+        stage[np.repeat(sims, m), k2.ravel()] = stage_idx
+
+        _, _, t1_wins, _ = _sim_match_arrays(arrays, k1.ravel(), k2.ravel(), True, rng)
+        t1_wins = t1_wins.reshape(k1.shape)
+        winners = np.where(t1_wins, k1, k2)
+        losers = np.where(t1_wins, k2, k1)
+
+        if stage_idx == 4: semi_losers = losers
+        if stage_idx == 5: runner_up = losers[:, 0]
+        bracket = winners.reshape(n, -1, 2) if m > 1 else winners
+
+    champion = bracket[:, 0]
+    stage[sims, champion] = 6
+
+    _, _, t1_wins, _ = _sim_match_arrays(arrays, semi_losers[:, 0], semi_losers[:, 1], True, rng)
+    third_place = np.where(t1_wins, semi_losers[:, 0], semi_losers[:, 1])
+
+    return {
+        'champion': champion.astype(np.int16),
+        'runner_up': runner_up.astype(np.int16),
+        'third_place': third_place.astype(np.int16),
+        'stage': stage,
+        'group_position': group_position,
+        'group_points': team_pts,
+        'group_gf': team_gf,
+        'group_ga': team_ga,
+    }
+
+def run_simulation_batch(n_sims, finalized_slots=None, rng=None, chunk_size=20000, seed=None, first_chunk=0):
+    """
+    Simulates n_sims full World Cups at once as NumPy arrays.
+    Returns {'teams': [48 slugs], ...} where every other entry is an array
+    with one row per simulation, indexed by position in 'teams':
+      champion / runner_up / third_place : (n,) team index
+      stage : (n, 48) furthest BATCH_STAGES index reached
+      group_position / group_points / group_gf / group_ga : (n, 48)
+    With `seed`, chunk k (simulations k*chunk_size onwards) draws from its own
+    stream simulation_rng(seed, k), so one chunk replays on its own:
+      run_simulation_batch(chunk_size, seed=seed, chunk_size=chunk_size, first_chunk=k)
+    Otherwise every chunk shares `rng` (or the global np.random state).
+    """
+    if int(n_sims) < 1: raise ValueError(f"n_sims must be at least 1, got {n_sims}")
+    if int(chunk_size) < 1: raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    if rng is None: rng = np.random
+
+    groups = get_wc_groups(finalized_slots)
+    teams = [get_slug(t) for grp in GROUP_LETTERS for t in groups[grp]]
+    arrays = pair_tables_for(teams)
+    slot_table = _r32_slot_table()
+
+    chunks = []
+    remaining = int(n_sims)
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        chunk_rng = rng if seed is None else simulation_rng(seed, first_chunk + len(chunks))
+        chunks.append(_run_batch_chunk(arrays, n, chunk_rng, slot_table))
+        remaining -= n
+
+    result = {'teams': teams}
+    for key in ['champion', 'runner_up', 'third_place', 'stage', 'group_position', 'group_points', 'group_gf', 'group_ga']:
+        result[key] = np.concatenate([c[key] for c in chunks])
+    return result
+
+# =============================================================================
+# --- PART 5: WARM-START SNAPSHOT ---
+# =============================================================================
+# The whole build (Elo replay, signatures, confed strength, precompute) is a
+# pure function of the CSVs and this file, so its output can be pickled once
+# and restored on later page loads instead of being rebuilt from scratch.
+
+ENGINE_SNAPSHOT_FILE = "engine_snapshot.pkl"
+# Snapshot location (None = next to the data) and whether a saved file outlives the process.
+# Pyodide's default filesystem is wiped on every reload: pyodide_adapter mounts IndexedDB there
+# and switches persistence on, otherwise saving would only cost time.
+SNAPSHOT_DIR = None
+SNAPSHOT_PERSISTENT = sys.platform != 'emscripten'
+
+SNAPSHOT_INPUT_FILES = [
+    "results.csv", "goalscorers.csv", "former_names.csv", "Formations.csv", "Player_Data.csv",
+    "Current_Squad.csv", "Recent_Call_Ups.csv", "possible_matchups.csv"
+]
+
+SNAPSHOT_GLOBALS = [
+    'TEAM_STATS', 'TEAM_HISTORY', 'ELO_CHECKPOINTS', 'ENGINE_STATE', 'TEAM_TALENT', 'TEAM_PROFILES', 'ADVANCED_TEAM_DATA',
+    'CONFED_MULTIPLIERS', 'TEAM_PRECOMPUTE', 'TEAM_REGISTRY', 'PRECOMPUTE_ARRAYS', 'PAIR_TABLES',
+    'TEAM_FORMATIONS', 'TEAM_CONFEDS', 'PRETTY_NAMES', 'R32_LOOKUP', 'AVG_GOALS', 'calculated_hfa'
+]
+
+def compute_snapshot_key():
+    """
+    SHA-256 over every input CSV and the engine source. Any change to the data
+    or to an engine constant (weights, cutoffs, K factors...) gives a new key.
+    """
+    h = hashlib.sha256()
+    for file in [resolve_data_path(f) for f in SNAPSHOT_INPUT_FILES] + [__file__]:
+        h.update(os.path.basename(file).encode('utf-8'))
+        try:
+            with open(file, 'rb') as f:
+                h.update(f.read())
+        except OSError:
+            h.update(b'<missing>')
+    return h.hexdigest()
+
+def snapshot_path():
+    if SNAPSHOT_DIR: return os.path.join(SNAPSHOT_DIR, ENGINE_SNAPSHOT_FILE)
+    return resolve_data_path(ENGINE_SNAPSHOT_FILE)
+
+def save_engine_snapshot(path=None, key=None):
+    """
+    Pickles the built engine state to snapshot_path(). Skipped (False) when nothing
+    can persist it. Failures are logged, never raised.
+    """
+    if path is None and not SNAPSHOT_PERSISTENT: return False
+    path = path or snapshot_path()
+    try:
+        payload = {
+            'key': key or compute_snapshot_key(),
+            'state': {name: globals()[name] for name in SNAPSHOT_GLOBALS}
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        LOGGER.error(f"Could not save engine snapshot: {e}")
+        return False
+
+def load_engine_snapshot(path=None, key=None):
+    """
+    Restores the engine globals from a snapshot if its key matches the
+    current data + engine. Returns True on a warm start, False otherwise.
+    """
+    path = path or snapshot_path()
+    if not os.path.exists(path): return False
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+        if payload.get('key') != (key or compute_snapshot_key()):
+            LOGGER.log("Engine snapshot is stale, rebuilding.")
+            return False
+        globals().update(payload['state'])
+        LOGGER.log(f"Warm start: restored engine snapshot ({len(TEAM_STATS)} teams).")
+        return True
+    except Exception as e:
+        LOGGER.error(f"Could not load engine snapshot: {e}")
+        return False
+
+def boot_engine(use_snapshot=True):
+    """
+    Headless equivalent of main.initialize_app: warm start from the snapshot if it
+    is current, otherwise run the full build (and refresh the snapshot).
+    """
+    use_snapshot = use_snapshot and SNAPSHOT_PERSISTENT
+    snapshot_key = compute_snapshot_key() if use_snapshot else None
+    if use_snapshot and load_engine_snapshot(key=snapshot_key):
+        return True
+
+    global TEAM_STATS, TEAM_PROFILES, AVG_GOALS
+    TEAM_STATS, TEAM_PROFILES, AVG_GOALS, results_df = initialize_engine()
+    if results_df is None:
+        raise RuntimeError("Engine build failed, see the log above")
+    engineer_team_signatures(results_df)
+    calculate_confed_strength(results_df)
+    precompute_match_data()
+    if use_snapshot: save_engine_snapshot(key=snapshot_key)
+    return False
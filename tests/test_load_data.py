@@ -0,0 +1,39 @@
+# Loader checks. Run them on the pandas the browser ships (Pyodide 0.23 -> pandas 1.5.3)
+# as well as the current release: dtype handling differs between 1.x, 2.x and 3.x.
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import simulation_engine as sim
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+@pytest.fixture(autouse=True)
+def repo_data(monkeypatch):
+    monkeypatch.setattr(sim, 'DATA_DIR', DATA_DIR)
+    sim.clear_dataset_cache()
+    yield
+    sim.clear_dataset_cache()
+
+def test_load_data_reads_every_file():
+    results, scorers, names, players, formations, squad, callups = sim.load_data()
+    for df in (results, scorers, names, players, formations, squad, callups):
+        assert len(df) > 0
+    assert pd.api.types.is_datetime64_any_dtype(results['date'])
+    assert pd.api.types.is_integer_dtype(results['home_score'])
+    assert isinstance(results['home_team'].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_bool_dtype(scorers['penalty'])
+
+def test_text_columns_skip_categories_and_numbers():
+    df = pd.DataFrame({'name': ['a'], 'team': pd.Categorical(['x']), 'n': [1]})
+    assert sim.text_columns(df) == ['name']
+
+def test_read_csv_schema_strips_text(tmp_path):
+    path = tmp_path / "Formations.csv"
+    path.write_text("Nation,Formation\n Brazil ,  4-3-3 \n", encoding='utf-8')
+    df = sim.read_csv_schema("Formations.csv", str(path))
+    assert df['Formation'].tolist() == ['4-3-3']
+    assert df['Nation'].tolist() == ['Brazil']